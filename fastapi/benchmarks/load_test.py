@@ -0,0 +1,54 @@
+"""
+Load test of POST /articles: sends requests from a number of concurrent clients and reports the
+throughput and the latency percentiles. The podcasts it creates are queued for synthesis as usual,
+so point it to a deployment where that is fine, or stop the tts service while it runs.
+
+    python benchmarks/load_test.py http://localhost:5050 --requests 2000 --concurrency 64
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+import urllib.request
+
+BODY = {"article_urls": ["https://www.ansa.it/sito/notizie/cronaca/cronaca.shtml"], "voice": "Male1"}
+
+
+def post(url):
+    request = urllib.request.Request(f"{url}/articles", data=json.dumps(BODY).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            ok = response.status == 201
+    except OSError:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", help="base url of the fastapi service")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32, help="clients sending requests at the same time")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(post, [args.url] * args.requests))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    failed = sum(not ok for ok, _ in results)
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {failed} failed")
+    print(f"throughput: {args.requests / elapsed:.1f} requests/s")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1e3:.1f} ms, p95 {percentile(latencies, 0.95) * 1e3:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1e3:.1f} ms, max {latencies[-1] * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
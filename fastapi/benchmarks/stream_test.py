@@ -0,0 +1,68 @@
+"""
+Time to first audio of a podcast streamed from GET /stream, against the time it takes to be
+generated, as clients polling GET /info until Succeeded used to wait.
+
+Posts a podcast, reads its stream to the end, and reports:
+ - time to first byte of the stream (the jingle)
+ - time to the first article, from the first_audio_at the tts workers record
+ - time to the end of the stream and to the Succeeded status
+
+    python benchmarks/stream_test.py http://localhost:5050 --articles 5
+"""
+import argparse
+from datetime import datetime, timezone
+import json
+import time
+import urllib.request
+
+ARTICLE_URL = "https://www.ansa.it/sito/notizie/cronaca/cronaca.shtml"
+# seconds between two requests to GET /info
+POLL_INTERVAL = 0.5
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", help="base url of the fastapi service")
+    parser.add_argument("--articles", type=int, default=5, help="articles of the podcast")
+    parser.add_argument("--voice", default="Male1")
+    args = parser.parse_args()
+
+    body = {"article_urls": [ARTICLE_URL] * args.articles, "voice": args.voice}
+    request = urllib.request.Request(f"{args.url}/articles", data=json.dumps(body).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    requested_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=60) as response:
+        podcast_id = json.load(response)["podcast_id"]
+
+    streamed = 0
+    first_byte = None
+    with urllib.request.urlopen(f"{args.url}/stream/{podcast_id}", timeout=600) as response:
+        while chunk := response.read1(64 * 1024):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            streamed += len(chunk)
+    stream_end = time.perf_counter() - start
+
+    while (info := get_json(f"{args.url}/info/{podcast_id}"))["status"] not in ("Succeeded", "Failed"):
+        time.sleep(POLL_INTERVAL)
+    generated = time.perf_counter() - start
+
+    print(f"podcast {podcast_id}, {args.articles} articles: {info['status']}, {streamed / 1024:.0f} kB streamed")
+    print(f"time to first byte: {first_byte:.2f}s")
+    if info.get("first_audio_at"):
+        first_audio = datetime.fromisoformat(info["first_audio_at"])
+        if first_audio.tzinfo is None:
+            # mongo returns the dates in utc, without their timezone
+            first_audio = first_audio.replace(tzinfo=timezone.utc)
+        print(f"time to first article: {(first_audio - requested_at).total_seconds():.2f}s")
+    print(f"end of the stream: {stream_end:.2f}s, generation: {generated:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
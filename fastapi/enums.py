@@ -11,3 +11,4 @@ class Status(str, Enum):
 class Voice(str, Enum):
     Male1 = "Male1"
     Female1 = "Female1"
+    Vits = "Vits"
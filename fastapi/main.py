@@ -1,8 +1,8 @@
-from fastapi import FastAPI, Path, status
+from fastapi import FastAPI, Path, Request, status
 from database import init_db
 from service import Service
 from schemas import *
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 import os
 
 app = FastAPI()
@@ -12,6 +12,12 @@ service = Service()
 @app.on_event("startup")
 async def init():
     await init_db()
+    await service.start()
+
+
+@app.on_event("shutdown")
+async def close():
+    await service.stop()
 
 
 @app.post("/articles", status_code=status.HTTP_201_CREATED, response_model=ArticlePostResponse)
@@ -37,3 +43,12 @@ async def get_podcast_file(podcast_id: PydanticObjectId = Path(title="Id of the
     Download podcast with given id
     """
     return FileResponse(await service.get_file_path(podcast_id), media_type="audio/mp3")
+
+
+@app.get("/stream/{podcast_id}")
+async def stream_podcast(request: Request, podcast_id: PydanticObjectId = Path(title="Id of the podcast")):
+    """
+    Stream podcast with given id while it is being synthesized: the jingle right away, then each
+    article as soon as it and the ones before it are ready
+    """
+    return StreamingResponse(await service.stream_podcast(podcast_id, request), media_type="audio/mp3")
@@ -4,6 +4,9 @@ from datetime import datetime
 from beanie import Document, PydanticObjectId
 from typing import Union
 
+# highest priority a podcast can request, as supported by the article queues of the tts workers
+MAX_PRIORITY = 9
+
 
 class Podcast(Document):
     status: str
@@ -11,6 +14,8 @@ class Podcast(Document):
     article_urls: list[str]
     created_at: Union[datetime, None] = None
     file_path: Union[str, None] = None
+    first_audio_at: Union[datetime, None] = None
+    priority: Union[int, None] = None
 
     class Settings:
         name = "podcast"
@@ -21,6 +26,8 @@ class PodcastGetResponse(BaseModel):
     status: str
     voice: str
     created_at: Union[datetime, None] = None
+    # when the first article could be streamed, long before created_at for large podcasts
+    first_audio_at: Union[datetime, None] = None
 
 
 class ArticlePostResponse(BaseModel):
@@ -30,12 +37,15 @@ class ArticlePostResponse(BaseModel):
 class ArticlePostRequest(BaseModel):
     article_urls: list[str]
     voice: Union[str, None] = Voice.Female1
+    # podcasts with a higher priority are synthesized first within their size class
+    priority: Union[int, None] = Field(None, ge=0, le=MAX_PRIORITY)
 
     class Config:
         schema_extra = {
             "example": {
                 "article_urls": ["https://www.ilgiornale.it/news/personaggi/boicottaggio-internazionale-minaccia-codacons-e-l-abbandono-2264291.html",
                                  "https://www.ilgiornale.it/news/personaggi/nessuna-incoronazione-frederik-danimarca-ecco-perch-2264306.html"],
-                "voice": "Male1"
+                "voice": "Male1",
+                "priority": 0
             }
         }
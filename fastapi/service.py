@@ -1,34 +1,30 @@
-from fastapi import HTTPException, status
+import asyncio
+import os
+from fastapi import HTTPException, Request, status
 from enums import Status
+from publisher import Publisher
 from schemas import *
-import pika
-import time
+from streams import STREAM_JINGLE_PATH, STREAMS_DIR, StreamWatchers, read_file
 
 
 class Service:
     def __init__(self):
-        time.sleep(10)  # wait for broker to start
-        self.connection = pika.BlockingConnection(
-            pika.ConnectionParameters("rabbitmq", heartbeat=0))
-        self.channel = self.connection.channel()
-        self.channel.queue_declare(queue="tts_queue", durable=True)
-        self.channel.confirm_delivery()
+        self.publisher = Publisher()
+        self.watchers = StreamWatchers()
+
+    async def start(self):
+        await self.publisher.connect()
+
+    async def stop(self):
+        await self.publisher.close()
 
     async def create_podcast(self, articleRequest: ArticlePostRequest):
         podcast = Podcast(status=Status.NotStarted, voice=articleRequest.voice,
-                          article_urls=articleRequest.article_urls)
+                          article_urls=articleRequest.article_urls, priority=articleRequest.priority)
         podcast = await podcast.insert()
         # add podcast id to worker's queue
-        try:
-            self.channel.basic_publish(exchange="",
-                                       routing_key="tts_queue",
-                                       body=str(podcast.id),
-                                       properties=pika.BasicProperties(
-                                           delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE
-                                       ),
-                                       mandatory=True)
-        except pika.exceptions.UnroutableError:
-            podcast.update({"$set": {Podcast.status: Status.Failed}})
+        if not await self.publisher.publish(str(podcast.id)):
+            await podcast.update({"$set": {Podcast.status: Status.Failed}})
         return ArticlePostResponse(podcast_id=podcast.id)
 
     async def get_info(self, podcast_id):
@@ -36,10 +32,36 @@ class Service:
         if not podcast:
             raise (HTTPException(status_code=status.HTTP_404_NOT_FOUND))
         return PodcastGetResponse(id=podcast.id, status=podcast.status, voice=podcast.voice,
-                                  created_at=podcast.created_at)
+                                  created_at=podcast.created_at, first_audio_at=podcast.first_audio_at)
 
     async def get_file_path(self, podcast_id):
         podcast = await Podcast.get(podcast_id)
         if not podcast or not podcast.file_path:
             raise (HTTPException(status_code=status.HTTP_404_NOT_FOUND))
         return podcast.file_path
+
+    async def stream_podcast(self, podcast_id, request: Request):
+        podcast = await Podcast.get(podcast_id)
+        if not podcast or podcast.status == Status.Failed:
+            raise (HTTPException(status_code=status.HTTP_404_NOT_FOUND))
+        if podcast.status == Status.Succeeded and not os.path.isdir(os.path.join(STREAMS_DIR, str(podcast.id))):
+            # the chunks of a podcast assembled long ago are pruned, the podcast file is complete
+            return self.__read(podcast.file_path)
+        return self.__stream(podcast, request)
+
+    @staticmethod
+    async def __read(path):
+        yield await asyncio.to_thread(read_file, path)
+
+    async def __stream(self, podcast, request):
+        """Yields the jingle, then the chunk of each article in order, as soon as it is synthesized.
+        Stops early if the podcast fails, a chunk takes too long or the client disconnects."""
+        watcher = self.watchers.join(podcast)
+        try:
+            yield await asyncio.to_thread(read_file, STREAM_JINGLE_PATH)
+            for index in range(len(podcast.article_urls)):
+                if not await watcher.wait(index) or await request.is_disconnected():
+                    return
+                yield await asyncio.to_thread(read_file, watcher.chunk_path(index))
+        finally:
+            self.watchers.leave(watcher)
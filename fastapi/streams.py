@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+from typing import Dict
+from beanie import PydanticObjectId
+from enums import Status
+from logger import get_logger
+from schemas import Podcast
+
+log = get_logger(__name__)
+
+# mp3 chunks of the podcasts being synthesized, written by the tts workers
+STREAMS_DIR = "/files/streams"
+STREAM_JINGLE_PATH = os.path.join(STREAMS_DIR, "jingle.mp3")
+# seconds between two checks for the next chunks of a podcast
+STREAM_POLL_INTERVAL = 0.5
+# seconds a stream waits for its next chunk before giving up
+STREAM_TIMEOUT = 600
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class StreamWatcher:
+    """
+    Follows the synthesis of a podcast for every client streaming it. A single task looks for the
+    next chunks and, while none shows up, checks the status of the podcast, so the database is
+    queried once per interval for each podcast, however many clients are listening. The clients
+    wait on a condition notified whenever the task sees a change.
+    """
+
+    def __init__(self, podcast_id: PydanticObjectId, n_articles: int):
+        self.podcast_id = podcast_id
+        self.n_articles = n_articles
+        # chunks available, in the order of the articles
+        self.ready = 0
+        # no more chunks will show up: the podcast failed, timed out, or its chunks were pruned
+        self.finished = False
+        self.listeners = 0
+        self.__changed = asyncio.Condition()
+        self.__task = None
+
+    def chunk_path(self, index: int) -> str:
+        return os.path.join(STREAMS_DIR, str(self.podcast_id), f"{index}.mp3")
+
+    def start(self):
+        self.__task = asyncio.create_task(self.__poll())
+
+    def stop(self):
+        if self.__task is not None:
+            self.__task.cancel()
+
+    async def wait(self, index: int) -> bool:
+        """Waits for the chunk of the article at index. False if it will never be available"""
+        async with self.__changed:
+            await self.__changed.wait_for(lambda: self.ready > index or self.finished)
+        return self.ready > index
+
+    async def __poll(self):
+        progress_at = time.monotonic()
+        while self.ready < self.n_articles and not self.finished:
+            ready = self.ready
+            while ready < self.n_articles and os.path.exists(self.chunk_path(ready)):
+                ready += 1
+            if ready > self.ready:
+                progress_at = time.monotonic()
+            elif time.monotonic() - progress_at > STREAM_TIMEOUT:
+                log.error(f"No chunk of podcast {self.podcast_id} in {STREAM_TIMEOUT}s, closing its streams.")
+                self.finished = True
+            else:
+                try:
+                    podcast = await Podcast.get(self.podcast_id)
+                except Exception as e:
+                    log.error(f"Could not check podcast {self.podcast_id}: {e!r}")
+                    podcast = None
+                # a succeeded podcast missing chunks had them pruned
+                if podcast is not None and (podcast.status == Status.Failed or podcast.status == Status.Succeeded
+                                            and not os.path.exists(self.chunk_path(ready))):
+                    self.finished = True
+
+            if ready > self.ready or self.finished:
+                async with self.__changed:
+                    self.ready = ready
+                    self.__changed.notify_all()
+            if self.ready < self.n_articles and not self.finished:
+                await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+
+class StreamWatchers:
+    """The watchers of the podcasts being streamed, created by their first client and stopped
+    when their last client goes away"""
+
+    def __init__(self):
+        self.__watchers: Dict[PydanticObjectId, StreamWatcher] = {}
+
+    def join(self, podcast: Podcast) -> StreamWatcher:
+        watcher = self.__watchers.get(podcast.id)
+        if watcher is None:
+            watcher = self.__watchers[podcast.id] = StreamWatcher(podcast.id, len(podcast.article_urls))
+            watcher.start()
+        watcher.listeners += 1
+        return watcher
+
+    def leave(self, watcher: StreamWatcher):
+        watcher.listeners -= 1
+        if watcher.listeners == 0:
+            watcher.stop()
+            del self.__watchers[watcher.podcast_id]
@@ -1,15 +1,39 @@
 from typing import List, Tuple, Any
 from bs4 import BeautifulSoup
 from charset_normalizer import detect as charset_detect
+from collections import defaultdict
+from urllib.parse import urlsplit
+import codecs
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import html
 import markdown
 import re
 import trafilatura as tr
+from article_store import ArticleStore, canonical_url, content_hash
+import extractors
 from logger import get_logger
 
 logger = get_logger(__name__)
 
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/115.0"
+TIMEOUT = (5, 20)  # connect and read timeouts, in seconds
+MAX_HOSTS = 8  # hosts whose keep-alive connections are pooled
+MAX_PER_HOST = 2  # concurrent requests to the same host
+
+# keep-alive connection pool shared by all the scraper consumers
+_session = requests.Session()
+_session.headers.update({"User-Agent": USER_AGENT})
+_session.mount("http://", HTTPAdapter(pool_connections=MAX_HOSTS, pool_maxsize=MAX_PER_HOST))
+_session.mount("https://", HTTPAdapter(pool_connections=MAX_HOSTS, pool_maxsize=MAX_PER_HOST))
+
+_host_slots = defaultdict(lambda: threading.BoundedSemaphore(MAX_PER_HOST))
+_host_slots_lock = threading.Lock()
+
+_content_type_charset = re.compile(r"charset=[\"']?([\w.:-]+)", flags=re.IGNORECASE)
+_meta_charset = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", flags=re.IGNORECASE)
+
 
 def fix_encoding(text: str):
     """
@@ -18,6 +42,79 @@ def fix_encoding(text: str):
     return text.encode("utf-8").decode("utf-8")
 
 
+# cleaning patterns, compiled once at import
+
+# text doesn't start with a capital letter, quotation marks or a digit
+# text doesn't end with a punctuation mark
+_fulltext_anomalies = [re.compile(r"^(?!(iPhone|iPad|iMac|iPod|eBay))[^A-ZÀ-Ý\"“«\d]+"),
+                       re.compile(r"[^\.!\?\"”»…\)]$"),
+                       # re.compile(r"\b[a-z]+[A-Z][a-z]+\b"),  # merged words
+                       ]
+
+# html_text contains asterisks (bug from trafilatura when parsing formatted text)
+_html_anomalies = [re.compile(r"\*")]
+
+_start_of_article_multiline = [re.compile(pattern, flags=re.MULTILINE) for pattern in [
+    r'Se hai scelto di non accettare i cookie di profilazione e tracciamento, puoi aderire all’abbonamento "Consentless" a un costo molto accessibile, oppure scegliere un altro abbonamento per accedere ad ANSA.it.',
+    r"Ti invitiamo a leggere le Condizioni Generali di Servizio, la Cookie Policy e l'Informativa Privacy.",
+    r"In aggiornamento",
+    r"Simply sign up .* -- delivered directly to your inbox.",
+    r"^#*\s*\*?(di).*?(\.|\n)"]]
+
+# sentences to cut the text from (present ONLY at the beginning of the article)
+# r"^.*\b[a-z]+(?=[A-Z][a-z]+\b)"
+_start_of_article = [re.compile(r"^.*Abbonati.*"), re.compile(r"^[^\w\"«“\d\*\#]+"), re.compile(r"^[A-Z]+\.")]
+_start_uppercase = re.compile(r"^\**[A-Z ]{5,}\b\**")
+_first_hyphen = re.compile(r"^([^\.\-\–\—]*(?<!(\"|”|»))(\s|\*)(-|–|—))[^\-\–\—]*?(\.|\n)")
+
+# sentences from which the text must be cut (present only at the end of the article), applied in
+# order: each marker is searched in the text left by the ones before it
+_end_of_article = [re.compile(pattern, flags=re.IGNORECASE) for pattern in [
+    r'\bcondividi\b', "continua a leggere", r"#*\s*leggi\s+anche", "leggi l'articolo completo",
+    r"\(?riproduzione riservata\)?", r"riproduzione riservata", "potrebbe interessarti anche", "abbonati per", "cronaca",
+    "le posizioni espresse in questo articolo", r"loading\.\.\.", r"-\s*Argomenti",
+    r"-\s*Altri Mondi", "per altri contenuti iscriviti", "la tua opinione è importante",
+    "Questo sito contribuisce all’audience", r"(#+\\s*)?brand connect", "Gentile lettore",
+    "Iscriviti alle newsletter", r"se vuoi iscriverti", r"[^/w+]Fin dalla sua nascita",
+    r"\b[A-Za-z0-9._%+-]+@corriere\.it\b", r"(?<!('|’))ultima ora",
+    r'\d{1,2} [a-zA-Z]+ \d{4} \(modifica il \d{1,2} [a-zA-Z]+ \d{4} \| \d{1,2}:\d{1,2}\)',
+    "#{0,4} La newsletter diario politico", "#+ dai blog", r"\*{0,4}Questo articolo contribuisce",
+    "ogni venerdì, nella tua casella di posta elettronica", "consigli24:",
+    r"- dal lunedì al venerdì dalle ore", "i commenti dei lettori",
+    r"\-\s+\*\*Leggi qui\*\*il GdB in edicola oggi|\-\s+Leggi qui il GdB in edicola oggi",
+    r"\s*#+\s*lascia un commento", r'\badv\b', r'il più letto\n',
+    r'- dal\n\*\*lunedì\*\*.*?\*\*venerdì\*\*dalle ore| - dal\nlunedì al venerdì dalle ore',
+    r'\*{1,2}?\s*(questo articolo)[^\n\.]*(è pubblicato)',
+    r'lavoce è di tutti', 'ogni venerdì, nella tua casella di posta elettronica,',
+    r"- \w+ \|", r"- \d+ min", r"\s*(-|–|—)\s*$", r"(?<=\.\s)(-|–|—).*\.$",
+    r"\([^\)]*foto.*?\)$"]]
+
+# sentences to be replaced with empty strings (present at the beginning and in the middle of the article)
+_garbage = [re.compile(pattern, flags=re.IGNORECASE) for pattern in [
+    r"\d+.+di lettura", r"#{0,4} Leggi anche\n(.*?\n)*?(?=\#+(?![\#]))",
+    r'(?<!\S)- a\b', r'g\+', r'\(©\)|©',
+    'contenuto riservato agli abbonati',  r'\n—', r'\(facebook\)',
+    r'sei già registrato / abbonato? accedi', r'- a\n- a', 'video su questo argomento',
+    '(?:\\*\\*Ascolta ora:\\*\\*|Ascolta ora:).*', r'(\*Mail: [^\*]+\*|Mail: [^\*]+)',
+    'articolo originariamente']]
+_ansa_garbage = [re.compile(pattern, flags=re.IGNORECASE) for pattern in ["In evidenza\n", "Extra\n", "LIVE\n"]]
+_ansa_hours = re.compile(r"^\d{2}:\d{2}", flags=re.MULTILINE)
+
+_hanging_line = re.compile(r"^(?!#).*(?<!(\.|\?|:)\*{2})(?<!(\.|\?|:)\s\*{2})(?<!(\.|\?|:)\*{1})(?<!(\.|\?|:)\s\*{1})(?<!\.\")((?<=[\'\’\"“\w\d\+ ])|(?<=\*{2})|(?<=\*{1}))(\n|$)", flags=re.MULTILINE)
+_newline_before_asterisk = re.compile(r"(^[^#].*)(\n)(?=\*)", flags=re.MULTILINE)
+_hashtag_line = re.compile(r"^#+$", flags=re.MULTILINE)
+_blank_lines = re.compile(r'\n{2,}')
+
+_em = re.compile(r'(\w?)\*(\s*)(.*?)(\s*)\*(\w?)')
+_strong = re.compile(r'(\w?)\*\*(\s*)(.*?)(\s*)\*\*(\w?)')
+_untagged_newline = re.compile(r"(?<!\>)\n")
+_asterisks_before_p = re.compile(r"\s*\*+\s*<\/p>")
+_heading_open = re.compile(r"<h\d>")
+_heading_close = re.compile(r"</h\d>")
+# end of a block of text that the sentence splitting of the synthesizer already breaks on
+_block_end = re.compile(r"[\.!\?:;…\"”»\)]$")
+
+
 def has_format_anomalies(fulltext: str, html_text: str) -> bool:
     """
     Checks if the text contains formatting anomalies or weird characters that could compromise
@@ -28,25 +125,13 @@ def has_format_anomalies(fulltext: str, html_text: str) -> bool:
         logger.info("Anomaly: html_text is shorter than fulltext")
         return True
 
-    patterns = [
-        # text doesn't start with a capital letter, quotation marks or a digit
-        r"^(?!(iPhone|iPad|iMac|iPod|eBay))[^A-ZÀ-Ý\"“«\d]+",
-        r"[^\.!\?\"”»…\)]$",  # text doesn't end with a punctuation mark
-        # r"\b[a-z]+[A-Z][a-z]+\b",  # merged words
-    ]
-
-    for pattern in patterns:
-        if match := re.search(pattern, fulltext):
+    for pattern in _fulltext_anomalies:
+        if match := pattern.search(fulltext):
             logger.info(f"Found anomaly in fulltext: {match.group()}")
             return True
 
-    html_patterns = [
-        # html_text contains asterisks (bug from trafilatura when parsing formatted text)
-        r"\*",
-    ]
-
-    for pattern in html_patterns:
-        if match := re.search(pattern, html_text):
+    for pattern in _html_anomalies:
+        if match := pattern.search(html_text):
             logger.info(f"Found anomaly in html_text: {match.group()}")
             return True
 
@@ -58,84 +143,43 @@ def clean_start_of_article(text: str, rm_uppercase: bool, rm_first_hyphen: bool)
     if len(lines) > 1 and lines[0] == lines[1]:
         text = '\n'.join(lines[2:])
 
-    start_of_article_multiline = [r'Se hai scelto di non accettare i cookie di profilazione e tracciamento, puoi aderire all’abbonamento "Consentless" a un costo molto accessibile, oppure scegliere un altro abbonamento per accedere ad ANSA.it.',
-                                  r"Ti invitiamo a leggere le Condizioni Generali di Servizio, la Cookie Policy e l'Informativa Privacy.",
-                                  r"In aggiornamento",
-                                  r"Simply sign up .* -- delivered directly to your inbox.",
-                                  r"^#*\s*\*?(di).*?(\.|\n)"]
-
-    # list containing the sentences to cut the text from (present ONLY at the beginning of the article)
-    # r"^.*\b[a-z]+(?=[A-Z][a-z]+\b)"
-    start_of_article = [r"^.*Abbonati.*", r"^[^\w\"«“\d\*\#]+", r"^[A-Z]+\."]
+    start_of_article = _start_of_article + [_start_uppercase] if rm_uppercase else _start_of_article
 
-    if rm_uppercase:
-        start_of_article.append(r"^\**[A-Z ]{5,}\b\**")
-
-    for pattern in start_of_article_multiline:
-        text = re.sub(pattern, "\n", text, flags=re.MULTILINE)
+    for pattern in _start_of_article_multiline:
+        text = pattern.sub("\n", text)
 
     for pattern in start_of_article:
-        if match := re.match(pattern, text):
+        if match := pattern.match(text):
             text = text[match.end():]
 
 
     # Remove up to the first hyphen, if there is not a second one in the same sentence
     if rm_first_hyphen:
-        if match := re.match(r"^([^\.\-\–\—]*(?<!(\"|”|»))(\s|\*)(-|–|—))[^\-\–\—]*?(\.|\n)", text):
+        if match := _first_hyphen.match(text):
             if len(match.group(1).split()) < 8:
                 text = text[match.end(1):]
 
     return text
 
 def clean_end_of_article(text: str) -> str:
-    # list containing the sentences from which the text must be cut (present only at the end of the article)
-    end_of_article = [r'\bcondividi\b', "continua a leggere", r"#*\s*leggi\s+anche", "leggi l'articolo completo",
-                      r"\(?riproduzione riservata\)?", r"riproduzione riservata", "potrebbe interessarti anche", "abbonati per", "cronaca",
-                      "le posizioni espresse in questo articolo", r"loading\.\.\.", r"-\s*Argomenti",
-                      r"-\s*Altri Mondi", "per altri contenuti iscriviti", "la tua opinione è importante",
-                      "Questo sito contribuisce all’audience", r"(#+\\s*)?brand connect", "Gentile lettore",
-                      "Iscriviti alle newsletter", r"se vuoi iscriverti", r"[^/w+]Fin dalla sua nascita", 
-                      r"\b[A-Za-z0-9._%+-]+@corriere\.it\b", r"(?<!('|’))ultima ora",
-                      r'\d{1,2} [a-zA-Z]+ \d{4} \(modifica il \d{1,2} [a-zA-Z]+ \d{4} \| \d{1,2}:\d{1,2}\)',
-                      "#{0,4} La newsletter diario politico", "#+ dai blog", r"\*{0,4}Questo articolo contribuisce",
-                      "ogni venerdì, nella tua casella di posta elettronica", "consigli24:",
-                      r"- dal lunedì al venerdì dalle ore", "i commenti dei lettori",
-                      r"\-\s+\*\*Leggi qui\*\*il GdB in edicola oggi|\-\s+Leggi qui il GdB in edicola oggi",
-                      r"\s*#+\s*lascia un commento", r'\badv\b', r'il più letto\n',
-                      r'- dal\n\*\*lunedì\*\*.*?\*\*venerdì\*\*dalle ore| - dal\nlunedì al venerdì dalle ore',
-                      r'\*{1,2}?\s*(questo articolo)[^\n\.]*(è pubblicato)',
-                      r'lavoce è di tutti', 'ogni venerdì, nella tua casella di posta elettronica,',
-                      r"- \w+ \|", r"- \d+ min", r"\s*(-|–|—)\s*$", r"(?<=\.\s)(-|–|—).*\.$",
-                      r"\([^\)]*foto.*?\)$"]
-
-    for pattern in end_of_article:
-        if match := re.search(pattern, text, flags=re.IGNORECASE):
+    for pattern in _end_of_article:
+        if match := pattern.search(text):
             text = text[:match.start()]
 
     return text
 
 def replace_garbage(text: str, rm_ansa: bool = False) -> str:
-    # list containing the sentences to be replaced with empty strings
-    # (present at the beginning and in the middle of the article)
-    to_replace = [r"\d+.+di lettura", r"#{0,4} Leggi anche\n(.*?\n)*?(?=\#+(?![\#]))",
-                  r'(?<!\S)- a\b', r'g\+', r'\(©\)|©',
-                  'contenuto riservato agli abbonati',  r'\n—', r'\(facebook\)',
-                  r'sei già registrato / abbonato? accedi', r'- a\n- a', 'video su questo argomento',
-                  '(?:\\*\\*Ascolta ora:\\*\\*|Ascolta ora:).*', r'(\*Mail: [^\*]+\*|Mail: [^\*]+)',
-                  'articolo originariamente']
-
+    to_replace = _garbage
     if rm_ansa:
-        patterns = ["In evidenza\n", "Extra\n", "LIVE\n"]
-        to_replace.extend(patterns)
+        to_replace = _garbage + _ansa_garbage
 
         # rm hours
-        text = re.sub(r"^\d{2}:\d{2}", "", text, flags=re.MULTILINE)
+        text = _ansa_hours.sub("", text)
 
     # The patterns in the 'to_replace' list are searched for and possibly replaced only once (count = 1),
     # this to avoid unintentional modification of the text
     for pattern in to_replace:
-        text = re.sub(
-                pattern, '', text, count=1, flags=re.IGNORECASE)
+        text = pattern.sub('', text, count=1)
 
     return text
 
@@ -166,14 +210,14 @@ def clean_hanging_lines(text: str) -> str:
     remove every sentence that ends without punctuation and is not a heading
     (html_text keeps the headings, while fulltext does not)
     """
-    return re.sub(r"^(?!#).*(?<!(\.|\?|:)\*{2})(?<!(\.|\?|:)\s\*{2})(?<!(\.|\?|:)\*{1})(?<!(\.|\?|:)\s\*{1})(?<!\.\")((?<=[\'\’\"“\w\d\+ ])|(?<=\*{2})|(?<=\*{1}))(\n|$)", "", text, flags=re.MULTILINE)
+    return _hanging_line.sub("", text)
 
 def clean_markdown(text: str) -> str:
     # all newlines before asterisks are replaced with a space, if they are not headings
-    text = re.sub(r"(^[^#].*)(\n)(?=\*)", r"\1 ", text.strip(), flags=re.MULTILINE)
+    text = _newline_before_asterisk.sub(r"\1 ", text.strip())
 
     # remove lines that contain only hashtags
-    text = re.sub(r"^#+$", "", text, flags=re.MULTILINE)
+    text = _hashtag_line.sub("", text)
 
     return text
 
@@ -215,7 +259,7 @@ def fix_text(article: tr.bare_extraction, rm_uppercase: bool = False, rm_hanging
 
 
     # all newlines and additional spaces are removed from the text
-    text = re.sub(r'\n{2,}', '\n', text.strip())
+    text = _blank_lines.sub('\n', text.strip())
 
     # remove titles at the end of the article
     lines = text.split('\n')
@@ -288,49 +332,81 @@ def fix_markdown(text: str):
     Fixes the markdown errors from the input text
     """
 
-    # <em> text with incorrect spacing
-    em_pattern = r'(\w?)\*(\s*)(.*?)(\s*)\*(\w?)'
-
     # Replace <em> text with correct spacing
-    fixed_text = re.sub(em_pattern, lambda match:
-                        (match.group(1) + " *" if match.group(1) else "*") + match.group(3) +
-                        ("* " + match.group(5) if match.group(5) else "*"), text)
-
-    # <strong> text with incorrect spacing
-    strong_pattern = r'(\w?)\*\*(\s*)(.*?)(\s*)\*\*(\w?)'
+    fixed_text = _em.sub(lambda match:
+                         (match.group(1) + " *" if match.group(1) else "*") + match.group(3) +
+                         ("* " + match.group(5) if match.group(5) else "*"), text)
 
     # Replace <strong> text with correct spacing
-    fixed_text = re.sub(strong_pattern, lambda match:
-                        (match.group(1) + " **" if match.group(1) else "**") + match.group(3) +
-                        ("** " + match.group(5) if match.group(5) else "**"), fixed_text)
+    fixed_text = _strong.sub(lambda match:
+                             (match.group(1) + " **" if match.group(1) else "**") + match.group(3) +
+                             ("** " + match.group(5) if match.group(5) else "**"), fixed_text)
 
     return fixed_text
 
 
 def fix_html(text: str):
     # replace all newlines not preceded by a tag with <br>
-    text = re.sub(r"(?<!\>)\n", "<br>", text)
+    text = _untagged_newline.sub("<br>", text)
 
     # if </p> is preceded by one or more '*', remove them
-    text = re.sub(r"\s*\*+\s*<\/p>", "</p>", text)
+    text = _asterisks_before_p.sub("</p>", text)
 
     # turn all headings into <h3> for consistency
-    text = re.sub(r"<h\d>", "<h3>", text)
-    text = re.sub(r"</h\d>", "</h3>", text)
+    text = _heading_open.sub("<h3>", text)
+    text = _heading_close.sub("</h3>", text)
 
     return text
 
 
+def scrape_fulltext_with_extractor(page_source: str, url: str) -> str:
+    """
+    Extracts the text with the rules registered for the newspaper of the article, which only
+    need the end of the article to be cut. Returns an empty string when the domain is unknown,
+    the rules match nothing or the result looks anomalous, so that trafilatura is used instead.
+    """
+    extraction = extractors.extract(page_source, url)
+    if extraction is None:
+        return ""
+
+    text = clean_end_of_article(extraction.text)
+    # headings, captions and list items end with a full stop, so that they are not read as part of
+    # the next sentence; the last block is left as it is for the anomaly check
+    blocks = [line.strip() for line in text.split("\n") if line.strip()]
+    text = " ".join([block if _block_end.search(block) else block + "." for block in blocks[:-1]] + blocks[-1:])
+    if has_format_anomalies(text, extraction.raw_text):
+        logger.info(f"Falling back to trafilatura for {url}")
+        return ""
+    return text
+
+
 def get_fulltext_from_page_source(page_source: str = "",
                                   include_images=False,
                                   include_formatting=False,
                                   include_comments=False,
-                                  include_tables=False) -> str:
+                                  include_tables=False,
+                                  url: str = "") -> str:
     '''
-    Given the HTML source code of an article webpage, uses trafilatura to retrieve the page fulltext
+    Given the HTML source code of an article webpage, retrieves the page fulltext with the
+    extractor of its newspaper, if there is one, or with trafilatura.
     Returns the fulltext as a string.
     '''
     fulltext = str()
+
+    try:
+        # the site extractors only produce plain text
+        if page_source and url and not (include_images or include_formatting or include_comments or include_tables):
+            fulltext = scrape_fulltext_with_extractor(page_source, url)
+    except Exception as e:
+        logger.error(
+            "Exception when retrieving article fulltext with the site extractor: %s" %
+            e)
+
+    if fulltext:
+        logger.info("...fulltext extracted with site rules, begins with: %s..." %
+                    fulltext[:80])
+        return fulltext
+
     logger.info(
         "Ingesting fulltext with Trafilatura from article webpage source.")
 
@@ -357,32 +433,124 @@ def get_fulltext_from_page_source(page_source: str = "",
                     fulltext[:80])
     return fulltext
 
-def get_page_source_with_trafilatura(url: str) -> str:
+def get_charset(content_type: str, page_bytes: bytes) -> str:
+    """
+    Returns the charset declared in the Content-Type header or in the html meta tags,
+    falling back to detection over the whole page only when neither is present or valid.
+    """
+    declared = []
+    if match := _content_type_charset.search(content_type or ""):
+        declared.append(match.group(1))
+    if match := _meta_charset.search(page_bytes[:4096]):
+        declared.append(match.group(1).decode("ascii", errors="ignore"))
+
+    for charset in declared:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            logger.info(f"Unknown charset declared by the page: {charset}")
+
+    if (encoding := charset_detect(page_bytes)['encoding']) == "windows-1250":
+        encoding = "iso-8859-1"
+    return encoding
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    with _host_slots_lock:
+        return _host_slots[urlsplit(url).netloc.lower()]
+
+
+def fetch_page(url: str, etag: str = None, last_modified: str = None) -> requests.Response:
+    '''
+    Sends a GET request through the shared connection pool, made conditional when validators are given.
+    Returns the response (possibly a 304 Not Modified).
+    '''
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    with _host_slot(url):
+        response = _session.get(url, headers=headers, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response
+
+
+def decode_page(response: requests.Response) -> str:
+    '''
+    Decodes the body of the response using the charset declared by the page.
+    '''
+    encoding = get_charset(response.headers.get("Content-Type"), response.content)
+    try:
+        return response.content.decode(encoding)
+    except (LookupError, UnicodeDecodeError, TypeError):
+        # the declared charset was wrong
+        return response.content.decode(
+            charset_detect(response.content)['encoding'] or "utf-8", errors="replace")
+
+
+def get_page_source(url: str) -> str:
     '''
     retrieves the HTML source of the page. Returns the page source as string.
     '''
     page_source = ""
     try:
-        if html_source := tr.fetch_url(url, decode=False):
-            if (encoding := charset_detect(html_source.data)['encoding']) == "windows-1250":
-                encoding = "iso-8859-1"
-
-            page_source = html_source.data.decode(encoding)
+        page_source = decode_page(fetch_page(url))
 
         if page_source is None or page_source == "" or not isinstance(page_source, str):
             raise Exception(
-                "trafilatura returned an empty or non-string page source")
+                "the server returned an empty or non-string page source")
 
     except Exception as exc:
         logger.error(
-            "[NewspaperScraper] Exception `%s` occurred when getting html source from trafilatura for url: %s" %
+            "[NewspaperScraper] Exception `%s` occurred when getting html source for url: %s" %
             (exc, url))
 
     return page_source
 
-def scrape_article(article_url: str) -> str:
-    page_source = get_page_source_with_trafilatura(article_url)
-    return get_fulltext_from_page_source(page_source=page_source)
+def scrape_article(article_url: str, store: ArticleStore = None) -> str:
+    if store is None:
+        page_source = get_page_source(article_url)
+        return get_fulltext_from_page_source(page_source=page_source, url=article_url)
+
+    # the canonical url is only the key of the store, the page is fetched from the url as sent:
+    # some sites route on the host case, trailing slashes or query parameters
+    url = canonical_url(article_url)
+    cached = store.get(url)
+    if cached and store.is_fresh(cached):
+        logger.info(f"Article {url} served from the article store.")
+        return cached.text
+
+    try:
+        if cached:
+            response = fetch_page(article_url, cached.etag, cached.last_modified)
+        else:
+            response = fetch_page(article_url)
+    except Exception as exc:
+        logger.error(
+            "[NewspaperScraper] Exception `%s` occurred when getting html source for url: %s" %
+            (exc, article_url))
+        # a stale article is better than no article
+        return cached.text if cached else ""
+
+    etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+    if cached and response.status_code == 304:
+        logger.info(f"Article {url} not modified since last scrape.")
+        store.touch(url, etag, last_modified)
+        return cached.text
+
+    page_source = decode_page(response)
+    if cached and content_hash(page_source) == cached.html_hash:
+        # same page, no need to extract and clean it again
+        logger.info(f"Article {url} unchanged since last scrape.")
+        store.touch(url, etag, last_modified)
+        return cached.text
+
+    fulltext = get_fulltext_from_page_source(page_source=page_source, url=article_url)
+    if fulltext:
+        store.put(url, page_source, fulltext, etag, last_modified)
+    return fulltext
 
 
 if __name__ == "__main__":
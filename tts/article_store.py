@@ -0,0 +1,87 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# query parameters that don't change the content of an article
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {"fbclid", "gclid", "refresh_ce"}
+
+
+def canonical_url(url: str) -> str:
+    """Normalizes an article url, so that the same article is stored only once"""
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PREFIXES) and k.lower() not in TRACKING_PARAMS]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ""))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class StoredArticle(NamedTuple):
+    url: str
+    html: str
+    html_hash: str
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+class ArticleStore:
+    """
+    Persistent store of the scraped articles, keyed by canonical url and shared by every worker.
+    Keeps the raw html with the validators (ETag, Last-Modified) needed to revalidate it, and the
+    cleaned fulltext, so that unchanged pages don't go through extraction and cleaning again.
+    """
+
+    def __init__(self, db_path: str = "/files/cache/articles.sqlite", ttl: float = 600,
+                 max_age: float = 7 * 24 * 3600):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.ttl = ttl
+        self.max_age = max_age
+        self.__lock = threading.Lock()
+        self.__db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.__db.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.__db.execute("PRAGMA table_info(articles)")]
+        if "text_hash" in columns:
+            # layout of an older version: the articles are scraped again
+            self.__db.execute("DROP TABLE articles")
+        self.__db.execute(
+            "CREATE TABLE IF NOT EXISTS articles (url TEXT PRIMARY KEY, html TEXT NOT NULL, "
+            "html_hash TEXT NOT NULL, text TEXT NOT NULL, etag TEXT, "
+            "last_modified TEXT, fetched_at REAL NOT NULL)")
+        self.__db.execute(
+            "CREATE INDEX IF NOT EXISTS articles_fetched_at ON articles (fetched_at)")
+
+    def get(self, url: str) -> Optional[StoredArticle]:
+        with self.__lock:
+            row = self.__db.execute(
+                "SELECT * FROM articles WHERE url = ?", (url,)).fetchone()
+        return StoredArticle(*row) if row else None
+
+    def is_fresh(self, article: StoredArticle) -> bool:
+        """Whether the article can be served without revalidating it"""
+        return time.time() - article.fetched_at < self.ttl
+
+    def put(self, url: str, html: str, text: str, etag: str = None, last_modified: str = None):
+        now = time.time()
+        with self.__lock:
+            self.__db.execute("INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (url, html, content_hash(html), text, etag, last_modified, now))
+            self.__db.execute(
+                "DELETE FROM articles WHERE fetched_at < ?", (now - self.max_age,))
+
+    def touch(self, url: str, etag: str = None, last_modified: str = None):
+        """Marks a revalidated article as fresh, updating its validators when the server sent new ones"""
+        with self.__lock:
+            self.__db.execute(
+                "UPDATE articles SET fetched_at = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), etag, last_modified, url))
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+import numpy as np
+from logger import get_logger
+
+log = get_logger(__name__)
+
+
+class AudioCache:
+    """
+    Content-addressed cache of raw int16 PCM audio, shared by every worker through the files volume.
+    An sqlite index keeps the size and last access time of each entry, so that the least recently
+    used entries are evicted once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = "/files/cache/audio", max_bytes: int = 2 * 1024 ** 3):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__index = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"),
+                                       timeout=30, isolation_level=None, check_same_thread=False)
+        self.__index.execute("PRAGMA journal_mode=WAL")
+        self.__index.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        self.__index.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    @staticmethod
+    def key(text: str, model: str, voice: str, version: str) -> str:
+        """Computes the cache key of a text synthesized by a given model, voice and checkpoint version.
+
+        Parameters
+        ----------
+        text : str
+            the synthesized text, whitespace differences are ignored
+        model : str
+            name of the model family
+        voice : str
+            name of the voice
+        version : str
+            version of the checkpoints
+
+        Returns
+        -------
+        str
+            hex digest identifying the audio
+        """
+        text = " ".join(text.split())
+        return hashlib.sha256("\0".join((text, model, voice, version)).encode("utf-8")).hexdigest()
+
+    def __path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pcm")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Returns the cached audio for key, or None if it is not cached"""
+        try:
+            audio = np.fromfile(self.__path(key), dtype=np.int16)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        with self.__lock:
+            self.__index.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return audio
+
+    def put(self, key: str, audio: np.ndarray):
+        """Stores audio under key, evicting the least recently used entries if needed"""
+        path = self.__path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first, so that readers never see partial audio
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        audio.astype(np.int16).tofile(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self.__lock:
+            self.__index.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                                 (key, os.path.getsize(path), time.time()))
+            self.__evict()
+
+    def __evict(self):
+        self.__index.execute("BEGIN IMMEDIATE")
+        try:
+            total, = self.__index.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+            if total <= self.max_bytes:
+                return
+
+            evicted = []
+            for key, size in self.__index.execute("SELECT key, size FROM entries ORDER BY last_access"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append(key)
+                total -= size
+            self.__index.executemany(
+                "DELETE FROM entries WHERE key = ?", [(key,) for key in evicted])
+        finally:
+            self.__index.execute("COMMIT")
+
+        for key in evicted:
+            try:
+                os.remove(self.__path(key))
+            except FileNotFoundError:
+                pass
+        log.debug(f"Evicted {len(evicted)} entries from the audio cache.")
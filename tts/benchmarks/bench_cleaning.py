@@ -0,0 +1,81 @@
+"""
+Compares the article cleaning of article_scraper against a reference implementation,
+over a corpus of saved news pages (one .html file per article). The reference is the scraper
+before its cleaning patterns were precompiled, at commit 4181846.
+
+    git show 4181846:tts/article_scraper.py > /tmp/article_scraper_ref.py
+    python benchmarks/bench_cleaning.py /files/pages --reference /tmp/article_scraper_ref.py
+"""
+import argparse
+import copy
+import glob
+import importlib.util
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import trafilatura as tr  # noqa: E402
+import article_scraper  # noqa: E402
+
+
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def extract(page_source):
+    # same preprocessing as scrape_fulltext_with_trafilatura, so that only the cleaning is timed
+    page_source = page_source.replace(
+        "<em><strong>", "<em>").replace("</strong></em>", "</em>")
+    page_source = page_source.replace(
+        "<strong><em>", "<em>").replace("</em></strong>", "</em>")
+    return tr.bare_extraction(page_source)
+
+
+def clean_all(module, articles, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        texts = [module.fix_text_from_trafilatura(copy.copy(article)) for article in articles]
+    return texts, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="directory containing the saved .html pages")
+    parser.add_argument("--reference", required=True, help="path of the reference article_scraper.py")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, "*.html")))
+    articles, names = [], []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            article = extract(f.read())
+        if article and article['text']:
+            articles.append(article)
+            names.append(os.path.basename(path))
+    if not articles:
+        sys.exit(f"no article could be extracted from {args.corpus}")
+
+    reference = load_module(args.reference, "article_scraper_reference")
+    ref_texts, ref_time = clean_all(reference, articles, args.repeat)
+    new_texts, new_time = clean_all(article_scraper, articles, args.repeat)
+
+    mismatches = [name for name, ref, new in zip(names, ref_texts, new_texts) if ref != new]
+    for name in mismatches:
+        print(f"output differs: {name}")
+
+    n_chars = sum(len(article['text']) for article in articles)
+    print(f"{len(articles)} articles, {n_chars / 1e6:.2f}M characters")
+    print(f"reference: {ref_time * 1e3:8.1f} ms  {len(articles) / ref_time:8.1f} articles/s")
+    print(f"current:   {new_time * 1e3:8.1f} ms  {len(articles) / new_time:8.1f} articles/s")
+    print(f"speedup: {ref_time / new_time:.2f}x, identical outputs: {len(articles) - len(mismatches)}/{len(articles)}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares the VITS text front end phonemizing one sentence at a time through phonemizer.phonemize
+(a new espeak backend per call) with the batched front end, cold and with a warm lexicon.
+
+    python benchmarks/bench_frontend.py datasetw/metadata_val_phonemes.json --limit 500
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from phonemizer import phonemize  # noqa: E402
+from vits.text import cleaners  # noqa: E402
+
+
+def reference_cleaners(text):
+    # italian_cleaners before the persistent backend and the lexicon
+    text = cleaners.lowercase(cleaners.convert_to_ascii(text))
+    phonemes = phonemize(text, language='it', backend='espeak', strip=True,
+                         preserve_punctuation=True, with_stress=True)
+    return cleaners.collapse_whitespace(phonemes)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="json lines manifest with a text field")
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64, help="sentences per phonemizer call")
+    args = parser.parse_args()
+
+    with open(args.manifest, encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()][:args.limit]
+    batches = [texts[i: i + args.batch_size] for i in range(0, len(texts), args.batch_size)]
+
+    reference, reference_time = timed(lambda: [reference_cleaners(text) for text in texts])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["LEXICON-PATH"] = os.path.join(tmp, "lexicon.sqlite")
+        cleaners.italian_cleaners_batch(["prima."])  # backend set up, outside the timings
+        cold, cold_time = timed(lambda: [p for batch in batches for p in cleaners.italian_cleaners_batch(batch)])
+        warm, warm_time = timed(lambda: [p for batch in batches for p in cleaners.italian_cleaners_batch(batch)])
+
+    for name, seconds in (("per sentence", reference_time), ("batched, cold lexicon", cold_time),
+                          ("batched, warm lexicon", warm_time)):
+        print(f"{name:24s} {seconds:8.2f}s  {len(texts) / seconds:8.1f} sentences/s")
+    # the lexicon reuses the pronunciation a word got in another sentence, which can differ
+    for name, outputs in (("cold", cold), ("warm", warm)):
+        same = sum(a == b for a, b in zip(reference, outputs))
+        print(f"{name} outputs identical to the reference: {same}/{len(texts)}")
+
+
+if __name__ == "__main__":
+    main()
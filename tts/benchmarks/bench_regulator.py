@@ -0,0 +1,104 @@
+"""
+Compares the dense length regulators (a [b, t_mel, t_text] one-hot mask multiplied by the encoder
+output, as regulate_len and generate_path did) with the repeat_interleave based ones now used by
+FastPitch and VITS, on ragged batches of growing sentence length, and checks that the outputs are
+identical.
+
+    python benchmarks/bench_regulator.py --lengths 16 64 256 1024 --batch-size 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastpitch.NeMo.nemo.collections.tts.helpers.helpers import regulate_len  # noqa: E402
+from vits import commons  # noqa: E402
+
+
+def reference_regulate_len(durations, enc_out, pace=1.0):
+    # regulate_len before repeat_interleave
+    dtype = enc_out.dtype
+    reps = durations.float() / pace
+    reps = (reps + 0.5).floor().long()
+    dec_lens = reps.sum(dim=1)
+
+    max_len = dec_lens.max()
+    reps_cumsum = torch.cumsum(torch.nn.functional.pad(reps, (1, 0, 0, 0), value=0.0), dim=1)[:, None, :]
+    reps_cumsum = reps_cumsum.to(dtype=dtype, device=enc_out.device)
+
+    range_ = torch.arange(max_len).to(enc_out.device)[None, :, None]
+    mult = (reps_cumsum[:, :, :-1] <= range_) & (reps_cumsum[:, :, 1:] > range_)
+    mult = mult.to(dtype)
+    return torch.matmul(mult, enc_out), dec_lens
+
+
+def reference_expand_frames(w_ceil, x_mask, m_p):
+    # SynthesizerTrn.infer before repeat_interleave
+    y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
+    y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(x_mask.dtype)
+    attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+    attn = commons.generate_path(w_ceil, attn_mask)
+    return torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(1, 2), y_mask
+
+
+def ragged_batch(batch_size, length, channels, generator):
+    # sentences between half and the full length, zero durations on the padding, as the models predict them
+    lengths = torch.randint(length // 2 + 1, length + 1, (batch_size,), generator=generator)
+    mask = commons.sequence_mask(lengths, length).float()
+    durations = torch.rand(batch_size, length, generator=generator) * 12 * mask
+    encoded = torch.randn(batch_size, length, channels, generator=generator)
+    return durations, mask, encoded
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[16, 64, 256, 1024], help="tokens per sentence")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--channels", type=int, default=384, help="encoder channels")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    generator = torch.Generator().manual_seed(0)
+    ok = True
+    with torch.inference_mode():
+        for length in args.lengths:
+            durations, mask, encoded = ragged_batch(args.batch_size, length, args.channels, generator)
+
+            (reference, reference_lens), reference_time = timed(
+                lambda: reference_regulate_len(durations, encoded), args.repeat)
+            (current, current_lens), current_time = timed(lambda: regulate_len(durations, encoded), args.repeat)
+            same = torch.equal(reference, current) and torch.equal(reference_lens, current_lens)
+            print(f"fastpitch {length:5d} tokens: dense {reference_time * 1e3:8.2f} ms, "
+                  f"repeat {current_time * 1e3:8.2f} ms, speedup {reference_time / current_time:6.2f}x, "
+                  f"identical: {same}")
+            ok &= same
+
+            w_ceil = torch.ceil(durations).unsqueeze(1)
+            x_mask = mask.unsqueeze(1)
+            m_p = encoded.transpose(1, 2)
+            (reference, y_mask), reference_time = timed(
+                lambda: reference_expand_frames(w_ceil, x_mask, m_p), args.repeat)
+            current, current_time = timed(lambda: commons.expand_frames(w_ceil, m_p, y_mask.size(2)), args.repeat)
+            same = torch.equal(reference, current)
+            print(f"vits      {length:5d} tokens: dense {reference_time * 1e3:8.2f} ms, "
+                  f"repeat {current_time * 1e3:8.2f} ms, speedup {reference_time / current_time:6.2f}x, "
+                  f"identical: {same}")
+            ok &= same
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Simulates the tts workers on a stream of podcasts of mixed sizes, with the single FIFO article
+queue they used to consume and with the size class queues polled by WeightedPoller, and reports
+the queue wait and end to end latency histograms of each size class.
+
+Articles are queued when their podcast arrives, and take a time proportional to their length to
+synthesize. The size of a podcast is known exactly here, while the scrapers extrapolate it from
+the articles scraped so far.
+
+    python benchmarks/bench_scheduler.py --podcasts 2000 --workers 4 --load 0.9
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jobs import SIZE_CLASSES, WeightedPoller, size_class  # noqa: E402
+from metrics import Histogram  # noqa: E402
+
+# characters synthesized per second by a worker
+CHARS_PER_SECOND = 400
+
+
+def random_podcast(rng):
+    # mostly single articles and short digests, a few long reviews of the news
+    n_articles = rng.choices([rng.randint(1, 2), rng.randint(3, 8), rng.randint(10, 20)], [0.6, 0.3, 0.1])[0]
+    return [rng.randint(1500, 6000) for _ in range(n_articles)]
+
+
+def simulate(podcasts, arrivals, n_workers, tiered):
+    """Runs the workers over the podcasts, returns the queue wait and end to end histograms by size class"""
+    queue_wait = {size: Histogram(f"queue wait {size}") for size, _ in SIZE_CLASSES}
+    latency = {size: Histogram(f"end to end {size}") for size, _ in SIZE_CLASSES}
+    sizes = [size_class(sum(articles)) for articles in podcasts]
+    queues = {size: deque() for size, _ in SIZE_CLASSES} if tiered else {"fifo": deque()}
+    poller = WeightedPoller()
+    pending = [len(articles) for articles in podcasts]
+    finished = [0.0] * len(podcasts)
+
+    workers = [0.0] * n_workers
+    next_podcast = 0
+    while True:
+        now = heapq.heappop(workers)
+        if next_podcast < len(podcasts) and not any(queues.values()):
+            # idle until the next podcast arrives
+            now = max(now, arrivals[next_podcast])
+        while next_podcast < len(podcasts) and arrivals[next_podcast] <= now:
+            queue = queues[sizes[next_podcast]] if tiered else queues["fifo"]
+            queue.extend((next_podcast, chars) for chars in podcasts[next_podcast])
+            next_podcast += 1
+        order = poller.order() if tiered else ["fifo"]
+        queue = next((queues[size] for size in order if queues[size]), None)
+        if queue is None:
+            break
+
+        podcast, chars = queue.popleft()
+        queue_wait[sizes[podcast]].record(now - arrivals[podcast])
+        done = now + chars / CHARS_PER_SECOND
+        finished[podcast] = max(finished[podcast], done)
+        pending[podcast] -= 1
+        if pending[podcast] == 0:
+            latency[sizes[podcast]].record(finished[podcast] - arrivals[podcast])
+        heapq.heappush(workers, done)
+    return queue_wait, latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--podcasts", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4, help="tts processes")
+    parser.add_argument("--load", type=float, default=0.9, help="fraction of the workers time spent synthesizing")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    podcasts = [random_podcast(rng) for _ in range(args.podcasts)]
+    mean_seconds = sum(map(sum, podcasts)) / len(podcasts) / CHARS_PER_SECOND
+    rate = args.load * args.workers / mean_seconds
+    arrivals, now = [], 0.0
+    for _ in podcasts:
+        now += rng.expovariate(rate)
+        arrivals.append(now)
+
+    for name, tiered in (("fifo", False), ("size classes", True)):
+        queue_wait, latency = simulate(podcasts, arrivals, args.workers, tiered)
+        print(f"{name}:")
+        for size, _ in SIZE_CLASSES:
+            print(f"  {queue_wait[size].summary()}")
+            print(f"  {latency[size].summary()}")
+
+
+if __name__ == "__main__":
+    main()
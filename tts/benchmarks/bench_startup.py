@@ -0,0 +1,55 @@
+"""
+Measures the startup cost of the italian normalizer, built from the grammar sources
+(as every worker used to do) and loaded from the precompiled .far files.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --model   # whole FastpitchModel, as logged by main.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import grammar_cache  # noqa: E402
+
+
+def time_normalizer(cache_dir):
+    start = time.perf_counter()
+    grammar_cache.load_normalizer(cache_dir)
+    return time.perf_counter() - start
+
+
+def time_model(cache_dir):
+    from fastpitch.tts_model import FastpitchModel
+
+    os.environ["TN-CACHE-DIR"] = cache_dir
+    BASE = "/checkpoints/fastpitch"
+    start = time.perf_counter()
+    FastpitchModel(f"{BASE}/male1/FastPitch.ckpt", f"{BASE}/male1/HifiGan.ckpt", "./male_conf.yaml")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", action="store_true", help="time the whole FastpitchModel instead of the normalizer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            # an empty cache dir builds and saves the grammars, the second run loads them
+            cold, warm = time_model(tmp), time_model(tmp)
+        else:
+            cold = time_normalizer(None)
+            time_normalizer(tmp)  # saves the .far files
+            warm = time_normalizer(tmp)
+
+    print(f"grammars built from sources: {cold:8.2f}s")
+    print(f"grammars loaded from .far:   {warm:8.2f}s")
+    print(f"speedup: {cold / warm:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
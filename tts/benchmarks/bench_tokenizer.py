@@ -0,0 +1,92 @@
+"""
+Compares the per character tokenizers of the FastPitch and VITS front ends (BaseCharsTokenizer.encode,
+text_to_sequence + commons.intersperse) with the vectorised batch encoding, and checks that they
+produce the same token ids.
+
+    python benchmarks/bench_tokenizer.py datasetw/metadata_val_phonemes.json --batch-size 64
+
+The VITS texts go through basic_cleaners by default, --cleaners italian_cleaners includes the phonemizer.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastpitch.sup import BaseCharsTokenizer, ItalianCharsTokenizer  # noqa: E402
+from vits import commons  # noqa: E402
+from vits.text import _symbol_to_id, clean_texts, cleaned_texts_to_batch  # noqa: E402
+
+
+def reference_sequence(cleaned_text, add_blank):
+    # text_to_sequence and commons.intersperse, on text already cleaned
+    sequence = [_symbol_to_id[symbol] for symbol in cleaned_text]
+    return commons.intersperse(sequence, 0) if add_blank else sequence
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def report(name, texts, reference, reference_time, current, current_time):
+    same = sum(a == b for a, b in zip(reference, current))
+    print(f"{name}: reference {len(texts) / reference_time:10.1f} texts/s, "
+          f"batched {len(texts) / current_time:10.1f} texts/s, speedup {reference_time / current_time:.2f}x")
+    print(f"{name}: identical outputs {same}/{len(texts)}")
+    return same == len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="json lines manifest with a text field")
+    parser.add_argument("--limit", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=64, help="texts per batch")
+    parser.add_argument("--cleaners", default="basic_cleaners", help="VITS cleaners the texts go through")
+    parser.add_argument("--no-blank", action="store_true", help="do not intersperse blanks in the VITS ids")
+    args = parser.parse_args()
+
+    with open(args.manifest, encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()][:args.limit]
+    batches = [texts[i: i + args.batch_size] for i in range(0, len(texts), args.batch_size)]
+
+    # FastPitch, configured as in male_conf.yaml
+    tokenizer = ItalianCharsTokenizer(punct=True, apostrophe=True, pad_with_space=True, phonemes=True)
+    reference, reference_time = timed(lambda: [BaseCharsTokenizer.encode(tokenizer, text) for text in texts])
+
+    def fastpitch_batched():
+        encoded = []
+        for batch in batches:
+            tokens, lengths = tokenizer.encode_batch(batch)
+            encoded.extend(tokens[row, :length].tolist() for row, length in enumerate(lengths.tolist()))
+        return encoded
+
+    current, current_time = timed(fastpitch_batched)
+    ok = report("fastpitch", texts, reference, reference_time, current, current_time)
+
+    # VITS, on the texts whose cleaned symbols are all in the symbol set
+    add_blank = not args.no_blank
+    cleaned = clean_texts(texts, [args.cleaners])
+    known = [text for text in cleaned if all(symbol in _symbol_to_id for symbol in text)]
+    print(f"vits: {len(cleaned) - len(known)} texts with unknown symbols skipped")
+    known_batches = [known[i: i + args.batch_size] for i in range(0, len(known), args.batch_size)]
+    reference, reference_time = timed(lambda: [reference_sequence(text, add_blank) for text in known])
+
+    def vits_batched():
+        encoded = []
+        for batch in known_batches:
+            sequences, lengths = cleaned_texts_to_batch(batch, add_blank)
+            encoded.extend(sequences[row, :length].tolist() for row, length in enumerate(lengths.tolist()))
+        return encoded
+
+    current, current_time = timed(vits_batched)
+    ok &= report("vits", known, reference, reference_time, current, current_time)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
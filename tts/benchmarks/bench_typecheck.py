@@ -0,0 +1,66 @@
+"""
+Measures the per sentence cost of NeMo neural type checking on CPU: FastPitch + HiFi-GAN synthesize
+the same sentences one at a time with @typecheck active, then again after enable_inference_mode.
+
+    python benchmarks/bench_typecheck.py --sentences 50 --threads 1
+"""
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastpitch.tts_model import FastpitchModel  # noqa: E402
+from inference_mode import enable_inference_mode  # noqa: E402
+
+SENTENCES = [
+    "Il governo ha approvato il decreto.",
+    "Le temperature resteranno sopra la media per tutta la settimana, con punte di trentacinque gradi al sud.",
+    "La partita è finita in parità.",
+    "Secondo gli analisti, la crescita dell'economia europea rallenterà nella seconda metà dell'anno.",
+]
+
+
+def synthesize_all(model, tokens):
+    # one sentence at a time, where the fixed cost of every call weighs the most
+    for sentence in tokens:
+        model.vocode(model.generate_spectrogram([sentence]))
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    base = "/checkpoints/fastpitch/male1"
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spec-gen", default=f"{base}/FastPitch.ckpt")
+    parser.add_argument("--vocoder", default=f"{base}/HifiGan.ckpt")
+    parser.add_argument("--conf", default="male_conf.yaml")
+    parser.add_argument("--sentences", type=int, default=40, help="sentences synthesized per round")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    model = FastpitchModel(args.spec_gen, args.vocoder, args.conf)
+    tokens = [model.parse(SENTENCES[i % len(SENTENCES)]) for i in range(args.sentences)]
+
+    checked = timed(lambda: synthesize_all(model, tokens), args.repeat) / len(tokens)
+    enable_inference_mode()
+    unchecked = timed(lambda: synthesize_all(model, tokens), args.repeat) / len(tokens)
+
+    print(f"type checked:   {checked * 1e3:8.2f} ms/sentence")
+    print(f"inference mode: {unchecked * 1e3:8.2f} ms/sentence")
+    print(f"overhead: {(checked - unchecked) * 1e3:.2f} ms/sentence ({100 * (checked - unchecked) / checked:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
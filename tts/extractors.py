@@ -0,0 +1,86 @@
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+import lxml.html
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# nodes that never belong to the text of an article
+COMMON_DROP = ("//script", "//style", "//noscript", "//figure", "//aside", "//iframe", "//form")
+
+
+class Rules(NamedTuple):
+    """XPath rules locating the article body in the pages of a newspaper"""
+    # paragraphs of the article body, in reading order
+    paragraphs: str
+    # nodes removed from the page before the paragraphs are collected (ads, related links, captions...)
+    drop: Tuple[str, ...] = ()
+
+
+class Extraction(NamedTuple):
+    # paragraphs joined by newlines
+    text: str
+    # whole text content of the selected paragraphs, markup included, used for the anomaly check
+    raw_text: str
+
+
+_registry: Dict[str, Rules] = {}
+
+
+def register(rules: Rules, *domains: str):
+    """Registers the rules used for the pages of the given domains and of their subdomains"""
+    for domain in domains:
+        _registry[domain.lower()] = rules
+
+
+def get_rules(url: str) -> Optional[Rules]:
+    """Returns the rules registered for the domain of url, or None if the domain is unknown"""
+    host = urlsplit(url).hostname or ""
+    parts = host.lower().split(".")
+    # www.ansa.it -> ansa.it -> it
+    for i in range(len(parts)):
+        if rules := _registry.get(".".join(parts[i:])):
+            return rules
+    return None
+
+
+def extract(page_source: str, url: str) -> Optional[Extraction]:
+    """
+    Pulls the article body out of the page with the rules registered for its domain.
+    Returns None when the domain is unknown or the rules match nothing, so that the caller can
+    fall back to the generic extraction.
+    """
+    rules = get_rules(url)
+    if rules is None or not page_source:
+        return None
+
+    tree = lxml.html.fromstring(page_source)
+    for xpath in COMMON_DROP + rules.drop:
+        for node in tree.xpath(xpath):
+            node.drop_tree()
+
+    paragraphs, raw_text = [], []
+    for node in tree.xpath(rules.paragraphs):
+        content = node.text_content()
+        raw_text.append(content)
+        if paragraph := " ".join(content.split()):
+            paragraphs.append(paragraph)
+
+    if not paragraphs:
+        logger.info(f"No paragraph matched the rules for {url}")
+        return None
+    return Extraction("\n".join(paragraphs), "\n".join(raw_text))
+
+
+register(Rules(paragraphs="//div[contains(@class, 'news-txt')]//p",
+               drop=("//div[contains(@class, 'news-txt')]//div[contains(@class, 'box')]",)),
+         "ansa.it")
+register(Rules(paragraphs="//p[contains(@class, 'chapter-paragraph')]",
+               drop=("//div[contains(@class, 'related')]",)),
+         "corriere.it")
+register(Rules(paragraphs="//div[contains(@class, 'typography--content')]/p",
+               drop=("//div[contains(@class, 'banner')]",)),
+         "ilgiornale.it")
+register(Rules(paragraphs="//div[contains(@class, 'article-body')]//p",
+               drop=("//div[contains(@class, 'article-body')]//div[contains(@class, 'adv')]",)),
+         "giornaledibrescia.it")
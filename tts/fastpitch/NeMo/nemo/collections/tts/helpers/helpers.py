@@ -526,19 +526,18 @@ def regulate_len(durations, enc_out, pace=1.0, mel_max_len=None):
             max_mel_len, the values after max_mel_len will be removed. Defaults to None, which has no max length.
     """
 
-    dtype = enc_out.dtype
     reps = durations.float() / pace
     reps = (reps + 0.5).floor().long()
     dec_lens = reps.sum(dim=1)
 
-    max_len = dec_lens.max()
-    reps_cumsum = torch.cumsum(torch.nn.functional.pad(reps, (1, 0, 0, 0), value=0.0), dim=1)[:, None, :]
-    reps_cumsum = reps_cumsum.to(dtype=dtype, device=enc_out.device)
-
-    range_ = torch.arange(max_len).to(enc_out.device)[None, :, None]
-    mult = (reps_cumsum[:, :, :-1] <= range_) & (reps_cumsum[:, :, 1:] > range_)
-    mult = mult.to(dtype)
-    enc_rep = torch.matmul(mult, enc_out)
+    # Repeat the rows of enc_out with repeat_interleave, instead of multiplying it by a dense
+    # (batch x mel_length x enc_length) one-hot mask, and lay the frames of each row out in a
+    # zero padded output: the rows of a ragged batch end at their dec_lens.
+    batch_size, _, enc_hidden = enc_out.shape
+    max_len = int(dec_lens.max()) if batch_size > 0 else 0
+    frames = torch.repeat_interleave(enc_out.reshape(-1, enc_hidden), reps.reshape(-1).to(enc_out.device), dim=0)
+    enc_rep = enc_out.new_zeros(batch_size, max_len, enc_hidden)
+    enc_rep[torch.arange(max_len, device=enc_out.device)[None, :] < dec_lens.to(enc_out.device)[:, None]] = frames
 
     if mel_max_len is not None:
         enc_rep = enc_rep[:, :mel_max_len]
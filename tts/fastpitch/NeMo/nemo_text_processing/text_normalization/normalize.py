@@ -19,7 +19,7 @@ from argparse import ArgumentParser
 from collections import OrderedDict
 from math import factorial
 from time import perf_counter
-from typing import Dict, List, Union
+from typing import Dict, Iterator, List, Union
 
 import pynini
 import regex
@@ -43,6 +43,10 @@ except (ModuleNotFoundError, ImportError) as e:
 
 SPACE_DUP = re.compile(' {2,}')
 
+# a word made only of letters, optionally elided (l'articolo, po'), capitalized at most on its first letter,
+# followed by sentence punctuation: nothing in it can be tagged as a semiotic class
+PLAIN_WORD = re.compile(r"[^\W\d_][^\W\d_A-Z]*(?:['’][^\W\d_A-Z]*)*[.,;:!?]*")
+
 
 class Normalizer:
     """
@@ -57,6 +61,7 @@ class Normalizer:
         whitelist: path to a file with whitelist replacements
         post_process: WFST-based post processing, e.g. to remove extra spaces added during TN.
             Note: punct_post_process flag in normalize() supports all languages.
+        memo_size: number of normalized sentences remembered by normalize(), 0 to disable the memo
     """
 
     def __init__(
@@ -69,9 +74,18 @@ class Normalizer:
         whitelist: str = None,
         lm: bool = False,
         post_process: bool = True,
+        memo_size: int = 4096,
     ):
         assert input_case in ["lower_cased", "cased"]
 
+        self.memo_size = memo_size
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.fast_path_hits = 0
+        self._memo = OrderedDict()
+        # sentences made of plain words skip the FSTs, only for the grammars whose whitelist is known
+        self._whitelist_pattern = None
+
         self.post_processor = None
 
         if lang == "en":
@@ -106,6 +120,14 @@ class Normalizer:
         elif lang == 'it':
             from fastpitch.NeMo.nemo_text_processing.text_normalization.it.taggers.tokenize_and_classify import ClassifyFst
             from fastpitch.NeMo.nemo_text_processing.text_normalization.it.verbalizers.verbalize_final import VerbalizeFinalFst
+            from fastpitch.NeMo.nemo_text_processing.text_normalization.it.utils import get_abs_path, load_labels
+
+            whitelist_rows = load_labels(whitelist or get_abs_path("data/whitelist.tsv"))
+            whitelisted = [row[0] for row in whitelist_rows if row and row[0]]
+            if input_case == "lower_cased":
+                whitelisted = [word.lower() for word in whitelisted]
+            self._whitelist_pattern = re.compile(
+                r"(?<!\w)(?:" + "|".join(map(re.escape, sorted(whitelisted, key=len, reverse=True))) + r")(?!\w)")
         elif lang == 'zh':
             from NeMo.nemo_text_processing.text_normalization.zh.taggers.tokenize_and_classify import ClassifyFst
             from NeMo.nemo_text_processing.text_normalization.zh.verbalizers.verbalize_final import VerbalizeFinalFst
@@ -263,6 +285,9 @@ class Normalizer:
         Main function. Normalizes tokens from written to spoken form
             e.g. 12 kg -> twelve kilograms
 
+        Sentences made only of plain words are returned as they are, and the last ``memo_size``
+        normalized sentences are remembered.
+
         Args:
             text: string that may include semiotic classes
             verbose: whether to print intermediate meta information
@@ -271,6 +296,48 @@ class Normalizer:
 
         Returns: spoken form
         """
+        if self.is_plain_text(text):
+            self.fast_path_hits += 1
+            return SPACE_DUP.sub(' ', ' '.join(text.split()))
+
+        key = (text, punct_pre_process, punct_post_process)
+        if key in self._memo:
+            self.memo_hits += 1
+            self._memo.move_to_end(key)
+            return self._memo[key]
+
+        self.memo_misses += 1
+        output = self._normalize(
+            text, verbose=verbose, punct_pre_process=punct_pre_process, punct_post_process=punct_post_process
+        )
+        if self.memo_size > 0:
+            self._memo[key] = output
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return output
+
+    def is_plain_text(self, text: str) -> bool:
+        """
+        Whether text has nothing to normalize: no digits, symbols, abbreviations or whitelisted words.
+
+        Args:
+            text: string that may include semiotic classes
+
+        Returns: True if the tagger could only tag the text as plain words and punctuation
+        """
+        if self._whitelist_pattern is None:
+            return False
+        words = text.split()
+        if not words or not all(PLAIN_WORD.fullmatch(word) for word in words):
+            return False
+        return self._whitelist_pattern.search(text) is None
+
+    def _normalize(
+        self, text: str, verbose: bool = False, punct_pre_process: bool = False, punct_post_process: bool = False
+    ) -> str:
+        """
+        Normalizes text with the tagger and verbalizer FSTs, see normalize()
+        """
         if len(text.split()) > 500:
             print(
                 "WARNING! Your input is too long and could take a long time to normalize."
@@ -347,37 +414,49 @@ class Normalizer:
         sentences = regex.split(split_pattern, text)
         return sentences
 
-    def _permute(self, d: OrderedDict) -> List[str]:
+    def _permute(self, d: OrderedDict) -> Iterator[str]:
         """
-        Creates reorderings of dictionary elements and serializes as strings
+        Creates reorderings of dictionary elements and serializes as strings.
+        Serializations are generated lazily, starting from the original order of the elements,
+        so that callers can stop at the first one that is accepted.
 
         Args:
             d: (nested) dictionary of key value pairs
 
         Return permutations of different string serializations of key value pairs
         """
-        l = []
         if PRESERVE_ORDER_KEY in d.keys():
-            d_permutations = [d.items()]
+            d_permutations = [tuple(d.items())]
         else:
             d_permutations = itertools.permutations(d.items())
         for perm in d_permutations:
-            subl = [""]
-            for k, v in perm:
-                if isinstance(v, str):
-                    subl = ["".join(x) for x in itertools.product(
-                        subl, [f"{k}: \"{v}\" "])]
-                elif isinstance(v, OrderedDict):
-                    rec = self._permute(v)
-                    subl = ["".join(x) for x in itertools.product(
-                        subl, [f" {k} {{ "], rec, [f" }} "])]
-                elif isinstance(v, bool):
-                    subl = ["".join(x) for x in itertools.product(
-                        subl, [f"{k}: true "])]
-                else:
-                    raise ValueError()
-            l.extend(subl)
-        return l
+            yield from self._serialize(perm, 0)
+
+    def _serialize(self, items: tuple, idx: int) -> Iterator[str]:
+        """
+        Serializes the key value pairs of items from idx on, in the order of _permute
+
+        Args:
+            items: key value pairs
+            idx: index of the next pair
+
+        Return string serializations of the pairs
+        """
+        if idx == len(items):
+            yield ""
+            return
+        k, v = items[idx]
+        if isinstance(v, str):
+            heads = [f"{k}: \"{v}\" "]
+        elif isinstance(v, OrderedDict):
+            heads = (f" {k} {{ {rec} }} " for rec in self._permute(v))
+        elif isinstance(v, bool):
+            heads = [f"{k}: true "]
+        else:
+            raise ValueError()
+        for head in heads:
+            for tail in self._serialize(items, idx + 1):
+                yield head + tail
 
     def generate_permutations(self, tokens: List[dict]):
         """
@@ -1,3 +1,6 @@
+import logging
+import numpy as np
+import torch
 from .NeMo.nemo.collections.tts.torch.tts_tokenizers import BaseCharsTokenizer
 
 
@@ -30,3 +33,73 @@ class ItalianCharsTokenizer(BaseCharsTokenizer):
             non_default_punct_list=non_default_punct_list,
             text_preprocessing_func=text_preprocessing_func
         )
+        self.__lookup = self.__build_lookup()
+
+    def __build_lookup(self):
+        # codepoint -> token id of the characters BaseCharsTokenizer.encode keeps, -1 for the others.
+        # The last entry is -1, codepoints past the table are clipped to it
+        space = self.tokens[self.space]
+        kept = [c for c in self.tokens if len(c) == 1 and
+                (c == space or c.isalnum() or c == "'" or (c in self.PUNCT_LIST and self.punct))]
+        lookup = np.full(max(ord(c) for c in kept) + 2, -1, dtype=np.int64)
+        for c in kept:
+            lookup[ord(c)] = self._token2id[c]
+        return lookup
+
+    def encode(self, text):
+        """See base class."""
+        tokens, _ = self.encode_batch([text])
+        return tokens[0].tolist()
+
+    def encode_batch(self, texts):
+        """Encodes texts at once, with the same rules as BaseCharsTokenizer.encode: unknown characters
+        are skipped, runs of spaces collapsed and leading and trailing spaces stripped.
+
+        Parameters
+        ----------
+        texts : list of str
+            texts to encode
+
+        Returns
+        -------
+        tuple of (torch.Tensor, torch.Tensor)
+            int64 token ids, [len(texts), max length], padded with self.pad, and the length of each text
+        """
+        texts = [self.text_preprocessing_func(text) for text in texts]
+        codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+        owner = np.repeat(np.arange(len(texts)), [len(text) for text in texts])
+
+        ids = self.__lookup[np.minimum(codes, len(self.__lookup) - 1)]
+        space = self._token2id[self.tokens[self.space]]
+        for i in np.flatnonzero((ids < 0) & (codes != ord(self.tokens[self.space]))):
+            logging.warning(f"Text: [{texts[owner[i]]}] contains unknown char: [{chr(codes[i])}]. "
+                            f"Symbol will be skipped.")
+        known = ids >= 0
+        ids, owner = ids[known], owner[known]
+
+        # a space is kept when it follows something other than a space of the same text
+        is_space = ids == space
+        follows_char = np.zeros(len(ids), dtype=bool)
+        follows_char[1:] = (owner[1:] == owner[:-1]) & ~is_space[:-1]
+        kept = ~is_space | follows_char
+        ids, owner, is_space = ids[kept], owner[kept], is_space[kept]
+        # after collapsing, at most one trailing space per text is left
+        is_last = np.ones(len(ids), dtype=bool)
+        is_last[:-1] = owner[1:] != owner[:-1]
+        kept = ~(is_space & is_last)
+        ids, owner = ids[kept], owner[kept]
+
+        lengths = np.bincount(owner, minlength=len(texts))
+        starts = np.cumsum(lengths) - lengths
+        columns = np.arange(len(ids)) - starts[owner]
+        if self.pad_with_space:
+            lengths = lengths + 2
+            columns += 1
+
+        tokens = np.full((len(texts), lengths.max(initial=0)), self.pad, dtype=np.int64)
+        tokens[owner, columns] = ids
+        if self.pad_with_space:
+            rows = np.arange(len(texts))
+            tokens[rows, 0] = space
+            tokens[rows, lengths - 1] = space
+        return torch.from_numpy(tokens), torch.from_numpy(lengths.astype(np.int64))
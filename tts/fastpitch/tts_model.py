@@ -1,36 +1,121 @@
-from fastpitch.NeMo.nemo.collections.tts.models import HifiGanModel
-from fastpitch.NeMo.nemo.collections.tts.models import FastPitchModel
-from fastpitch.NeMo.nemo_text_processing.text_normalization.normalize import Normalizer
+from fastpitch.NeMo.nemo.collections.tts.modules.fastpitch import FastPitchModule
 import numpy as np
-from model_interface import Model
+from grammar_cache import grammar_cache_dir, load_normalizer
+from model_interface import Model, Spectrogram, Speech, checkpoint_version, module_bytes, padding_bounds
 import torch
+from torch.nn.utils.rnn import pad_sequence
+from hydra.utils import instantiate
 from omegaconf import OmegaConf
 
 
+def load_state_dict(checkpoint_path, prefix):
+    """Loads the weights of a lightning checkpoint whose names start with prefix, stripping it"""
+    state_dict = torch.load(checkpoint_path, map_location="cpu")["state_dict"]
+    return {name[len(prefix):]: weights for name, weights in state_dict.items() if name.startswith(prefix)}
+
+
+def load_spectrogram_generator(conf, checkpoint_path):
+    """Builds only the modules FastPitchModel uses at inference time, skipping the normalizer,
+    datasets, preprocessor, aligner and losses, and loads their weights.
+
+    Returns
+    -------
+    tuple of (FastPitchModule, tokenizer)
+    """
+    cfg = conf.model
+    tokenizer = instantiate(cfg.text_tokenizer)
+    input_fft = instantiate(cfg.input_fft, n_embed=len(tokenizer.tokens), padding_idx=tokenizer.pad)
+    fastpitch = FastPitchModule(
+        input_fft,
+        instantiate(cfg.output_fft),
+        instantiate(cfg.duration_predictor),
+        instantiate(cfg.pitch_predictor),
+        None,  # the aligner is only needed for training
+        cfg.n_speakers,
+        cfg.symbols_embedding_dim,
+        cfg.pitch_embedding_kernel_size,
+        cfg.n_mel_channels,
+        cfg.max_token_duration,
+        cfg.get("speaker_emb_condition_prosody", False),
+        cfg.get("speaker_emb_condition_decoder", False),
+        cfg.get("speaker_emb_condition_aligner", False),
+    )
+    state_dict = {name: weights for name, weights in load_state_dict(checkpoint_path, "fastpitch.").items()
+                  if not name.startswith("aligner.")}
+    fastpitch.load_state_dict(state_dict)
+    return fastpitch.requires_grad_(False).eval(), tokenizer
+
+
+def load_vocoder(checkpoint_path):
+    """Builds only the HiFi-GAN generator, without discriminators and preprocessors, from the
+    configuration saved in the checkpoint"""
+    checkpoint = torch.load(checkpoint_path, map_location="cpu")
+    cfg = OmegaConf.create(checkpoint["hyper_parameters"]["cfg"])
+    generator = instantiate(cfg.generator)
+    generator.load_state_dict(
+        {name[len("generator."):]: weights for name, weights in checkpoint["state_dict"].items()
+         if name.startswith("generator.")})
+    return generator.requires_grad_(False).eval()
+
+
 class FastpitchModel(Model):
-    def __init__(self, spec_gen_path: str, vocoder_path: str, conf_path: str):
-        # hack to make it work
+    def __init__(self, spec_gen_path: str, vocoder_path: str, conf_path: str, max_batch_size: int = 8):
+        super().__init__()
         conf = OmegaConf.load(conf_path)
-        self.__spec_gen = FastPitchModel(cfg=conf.model)
-        self.__spec_gen.maybe_init_from_pretrained_checkpoint(cfg=conf)
-        self.__spec_gen.freeze()
-        self.__spec_gen.eval()
-        # load spectrogram generator and vocoder checkpoints
-        # self.__spec_gen = FastPitchModel.load_from_checkpoint(checkpoint_path=spec_gen_path,
-        #                                                       hparams_file="/app/fast_align.yaml").eval()
-        self.__vocoder = HifiGanModel.load_from_checkpoint(
-            checkpoint_path=vocoder_path).eval()
-
-        # change to italian normalizer
-        self.__spec_gen.normalizer = Normalizer(lang="it", input_case="cased")
-        self.__spec_gen.text_normalizer_call = self.__spec_gen.normalizer.normalize
+        # only the modules used for inference are built, the english normalizer the
+        # training configuration declares would be discarded anyway
+        self.__fastpitch, self.__tokenizer = load_spectrogram_generator(conf, spec_gen_path)
+        self.__vocoder = load_vocoder(vocoder_path)
+
+        # italian normalizer, with the grammars compiled at image build time
+        self.__normalizer = load_normalizer(grammar_cache_dir())
+        self.__normalizer_kwargs = conf.model.get("text_normalizer_call_kwargs", {})
+
+        # audio samples generated for each spectrogram frame
+        self.__hop_length = conf.n_window_stride
+        self.max_batch_size = max_batch_size
+        self.version = checkpoint_version(spec_gen_path, vocoder_path)
+
+    def share_memory(self):
+        self.__fastpitch.share_memory()
+        self.__vocoder.share_memory()
+
+    def weight_bytes(self):
+        return module_bytes(self.__fastpitch, self.__vocoder)
 
-    @torch.inference_mode()
     def synthesize(self, text):
-        parsed = self.__spec_gen.parse(str_input=text)
-        spectrogram = self.__spec_gen.generate_spectrogram(tokens=parsed)
-        audio = self.__vocoder.convert_spectrogram_to_audio(spec=spectrogram)
+        return self.synthesize_batch([text])[0].audio
+
+    def parse(self, text):
+        """Normalizes and tokenizes text, as FastPitchModel.parse"""
+        return self.parse_batch([text])[0]
+
+    def parse_batch(self, texts):
+        texts = [self.__normalizer.normalize(text, **self.__normalizer_kwargs) for text in texts]
+        # one vectorised encoding for all the texts, split back into a view per text
+        tokens, lengths = self.__tokenizer.encode_batch(texts)
+        return [tokens[row, :length] for row, length in enumerate(lengths.tolist())]
+
+    @torch.inference_mode()
+    def generate_spectrogram(self, tokens, n_prefix=0, n_suffix=0):
+        batch = pad_sequence(tokens, batch_first=True, padding_value=self.__fastpitch.encoder.padding_idx)
+        # pitch is the offset added to the predicted pitch, as in forward_for_export
+        spectrogram, dec_lens, durs_predicted, *_ = self.__fastpitch.infer(
+            text=batch, pitch=torch.zeros_like(batch, dtype=torch.float))
+        # frames per token, rounded as regulate_len does
+        durations = (durs_predicted + 0.5).floor().long().to('cpu').numpy()
+        bounds = [padding_bounds(durations[row, :len(t)], n_prefix, n_suffix, self.__hop_length)
+                  for row, t in enumerate(tokens)]
+        return Spectrogram(spectrogram, dec_lens.tolist(), bounds)
+
+    @torch.inference_mode()
+    def vocode(self, spectrogram):
+        audio = self.__vocoder(x=spectrogram.features).squeeze(1)
+        audio = audio.to('cpu').detach().numpy()
 
-        audio = audio.to('cpu').detach().numpy()[0]
-        audio = audio / np.abs(audio).max()
-        return audio
+        # split the batch back into sentences
+        speeches = []
+        for row, (length, bounds) in enumerate(zip(spectrogram.lengths, spectrogram.bounds)):
+            wave = audio[row, :length * self.__hop_length]
+            speeches.append(Speech(wave / np.abs(wave).max(), bounds))
+        return speeches
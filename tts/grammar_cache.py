@@ -0,0 +1,64 @@
+import hashlib
+import os
+import time
+from importlib import metadata
+from logger import get_logger
+
+log = get_logger(__name__)
+
+TN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      "fastpitch", "NeMo", "nemo_text_processing", "text_normalization")
+
+# sources the italian grammars are compiled from: the whole it/ package and the shared modules it imports
+GRAMMAR_SOURCES = ["it", "en/graph_utils.py", "en/taggers/punctuation.py", "es/taggers/word.py"]
+
+
+def grammar_version() -> str:
+    """Hashes the grammar sources and tsv data, together with the pynini version.
+
+    Returns
+    -------
+    str
+        a short hex digest that changes whenever the compiled grammars would change
+    """
+    digest = hashlib.sha256()
+    try:
+        digest.update(metadata.version("pynini").encode())
+    except metadata.PackageNotFoundError:
+        pass
+
+    paths = []
+    for source in GRAMMAR_SOURCES:
+        source = os.path.join(TN_DIR, source)
+        if os.path.isfile(source):
+            paths.append(source)
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.endswith((".py", ".tsv")))
+
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, TN_DIR).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def grammar_cache_dir() -> str:
+    """Directory holding the .far files of the current grammar version, under TN-CACHE-DIR"""
+    return os.path.join(os.getenv("TN-CACHE-DIR", "/app/grammars"), grammar_version())
+
+
+def load_normalizer(cache_dir: str = None):
+    """Creates the italian normalizer, loading the compiled grammars from cache_dir.
+    Grammars missing from cache_dir are built and saved there.
+    """
+    from fastpitch.NeMo.nemo_text_processing.text_normalization.normalize import Normalizer
+
+    start = time.perf_counter()
+    normalizer = Normalizer(lang="it", input_case="cased", cache_dir=cache_dir)
+    log.info(f"Italian normalizer loaded in {time.perf_counter() - start:.2f}s (grammars: {cache_dir}).")
+    return normalizer
+
+
+if __name__ == "__main__":
+    # run at image build time, so that workers only load the .far files
+    load_normalizer(grammar_cache_dir())
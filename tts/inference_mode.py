@@ -0,0 +1,43 @@
+import sys
+import wrapt
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# the pip package, whose modules the checkpoints instantiate, and the vendored copy under fastpitch/NeMo
+NEMO_COMMON_MODULES = ("nemo.core.classes.common", "fastpitch.NeMo.nemo.core.classes.common")
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def _strip_typecheck(common) -> int:
+    # replaces the @typecheck wrappers of the Typing classes loaded so far with the wrapped methods
+    stripped = 0
+    for cls in set(_subclasses(common.Typing)):
+        for name, attr in list(vars(cls).items()):
+            if isinstance(attr, wrapt.FunctionWrapper) and \
+                    isinstance(getattr(attr._self_wrapper, "__self__", None), common.typecheck):
+                setattr(cls, name, attr.__wrapped__)
+                stripped += 1
+    return stripped
+
+
+def enable_inference_mode():
+    """Turns NeMo neural type checking off for the whole process.
+
+    @typecheck validates the inputs of forward, infer and the other typed methods and attaches
+    neural_type to their outputs on every call. Disabling it makes the wrappers of the classes
+    loaded later forward the call unchecked, while the methods of the classes loaded so far are
+    unwrapped altogether. Safe to call again after loading more models.
+    """
+    for name in NEMO_COMMON_MODULES:
+        common = sys.modules.get(name)
+        if common is None:
+            continue
+        common.typecheck.set_typecheck_enabled(False)
+        stripped = _strip_typecheck(common)
+        log.info(f"NeMo type checking disabled ({name}: {stripped} methods unwrapped).")
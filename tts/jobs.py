@@ -0,0 +1,158 @@
+import json
+import os
+import shutil
+import time
+from typing import Dict, List
+import pika
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+from enums import Status
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# podcast ids, published by the fastapi service and split by the scrapers
+PODCAST_QUEUE = "tts_queue"
+# articles to scrape, published by the scrapers
+SCRAPE_QUEUE = "scrape_queue"
+# synthesis of scraped articles and assembly of podcasts, consumed by the tts workers from one
+# queue per size class of the podcast, so that small podcasts don't wait behind large ones
+ARTICLE_QUEUE = "article_queue"
+# size classes, smallest first, with the most characters a podcast of the class is estimated to have
+SIZE_CLASSES = (("small", 5000), ("medium", 25000), ("large", None))
+ARTICLE_QUEUES = {size: f"{ARTICLE_QUEUE}.{size}" for size, _ in SIZE_CLASSES}
+# polls of each size class in a scheduling round: the large podcasts still get their share
+POLL_WEIGHTS = {"small": 6, "medium": 3, "large": 1}
+# message priorities within a queue, podcasts can request up to MAX_PRIORITY
+MAX_PRIORITY = 9
+# raw int16 audio of the synthesized articles, until their podcast is assembled
+ARTICLES_DIR = "/files/articles"
+# mp3 chunks streamed while the podcast is synthesized: {podcast_id}/{index}.mp3 for each article,
+# followed by the jingle, and the jingle opening every stream
+STREAMS_DIR = "/files/streams"
+STREAM_JINGLE_PATH = os.path.join(STREAMS_DIR, "jingle.mp3")
+# seconds the chunks are kept after their podcast is assembled, for the clients still streaming it
+STREAM_TTL = 3600
+
+
+def declare_queues(channel):
+    for queue in (PODCAST_QUEUE, SCRAPE_QUEUE):
+        channel.queue_declare(queue=queue, durable=True)
+    for queue in ARTICLE_QUEUES.values():
+        # assembly jobs are sent with MAX_PRIORITY + 1, ahead of any article
+        channel.queue_declare(queue=queue, durable=True, arguments={"x-max-priority": MAX_PRIORITY + 1})
+
+
+def publish(channel, queue: str, job: dict, priority: int = None):
+    """Publishes a json encoded job as a persistent message"""
+    channel.basic_publish(exchange="",
+                          routing_key=queue,
+                          body=json.dumps(job),
+                          properties=pika.BasicProperties(
+                              delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE,
+                              priority=priority
+                          ))
+
+
+def estimate_chars(podcast: dict) -> int:
+    """Characters of the podcast, extrapolated from the articles scraped so far"""
+    scraped = podcast.get("articles_scraped") or 0
+    if not scraped:
+        return 0
+    return podcast["chars_scraped"] * len(podcast["article_urls"]) // scraped
+
+
+def size_class(chars: int) -> str:
+    for size, max_chars in SIZE_CLASSES:
+        if max_chars is None or chars <= max_chars:
+            return size
+
+
+def publish_job(channel, podcast: dict, job: dict, priority: int = None):
+    """Queues a job of podcast on the article queue of its size class, with the time it was queued"""
+    size = size_class(estimate_chars(podcast))
+    publish(channel, ARTICLE_QUEUES[size], {**job, "size": size, "queued_at": time.time()}, priority)
+
+
+class WeightedPoller:
+    """
+    Order in which the tts workers poll the size classes, by smooth weighted round robin: each
+    round the class with the most credit is polled first and pays the credit of a full round. The
+    others follow smallest first, so a worker is never idle while any class has jobs, and a class
+    with weight w is polled first w times every sum(weights) rounds, however busy the others are.
+    """
+
+    def __init__(self, weights: Dict[str, int] = POLL_WEIGHTS):
+        self.weights = weights
+        self.__total = sum(weights.values())
+        self.__credits = {size: 0 for size in weights}
+
+    def order(self) -> List[str]:
+        for size, weight in self.weights.items():
+            self.__credits[size] += weight
+        first = max(self.__credits, key=self.__credits.get)
+        self.__credits[first] -= self.__total
+        return [first] + [size for size in self.weights if size != first]
+
+
+def article_path(podcast_id: str, index: int) -> str:
+    return os.path.join(ARTICLES_DIR, podcast_id, f"{index}.pcm")
+
+
+def stream_path(podcast_id: str, index: int) -> str:
+    return os.path.join(STREAMS_DIR, podcast_id, f"{index}.mp3")
+
+
+def prune_streams(max_age: float = STREAM_TTL):
+    """Removes the chunks of the podcasts streamed more than max_age seconds ago"""
+    now = time.time()
+    with os.scandir(STREAMS_DIR) as entries:
+        for entry in entries:
+            if entry.is_dir() and now - entry.stat().st_mtime > max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def is_failed(podcasts: Collection, podcast_id: str) -> bool:
+    return podcasts.find_one({"_id": ObjectId(podcast_id)}, {"status": 1})["status"] == Status.Failed
+
+
+def fail_podcast(podcasts: Collection, podcast_id: str):
+    podcasts.update_one({"_id": ObjectId(podcast_id)}, {"$set": {"status": Status.Failed}})
+
+
+def remove_audio(podcast_id: str):
+    """Removes the articles audio and the stream chunks of a failed podcast"""
+    shutil.rmtree(os.path.join(ARTICLES_DIR, podcast_id), ignore_errors=True)
+    shutil.rmtree(os.path.join(STREAMS_DIR, podcast_id), ignore_errors=True)
+
+
+def finish_article(podcasts: Collection, channel, podcast_id: str, index: int):
+    """Counts an article of the podcast as done, whether it succeeded or failed. Once the last one
+    is done, queues the assembly of the podcast, or removes the articles audio if it failed.
+
+    Parameters
+    ----------
+    podcasts : Collection
+        the podcast collection
+    channel : pika channel
+        the channel the assembly job is published on
+    podcast_id : str
+        id of the podcast
+    index : int
+        index of the article in the podcast
+    """
+    # counted once, even if the message is delivered again after a crash
+    podcast = podcasts.find_one_and_update(
+        {"_id": ObjectId(podcast_id), "articles_done": {"$ne": index}},
+        {"$inc": {"articles_pending": -1}, "$push": {"articles_done": index}},
+        return_document=ReturnDocument.AFTER)
+    # already counted: whoever counted it queued the assembly or removed the audio
+    if podcast is None or podcast["articles_pending"] > 0:
+        return
+
+    if podcast["status"] == Status.Failed:
+        remove_audio(podcast_id)
+    else:
+        # the last article: any tts worker can assemble the podcast, before any other job of its class
+        publish_job(channel, podcast, {"job": "assemble", "podcast_id": podcast_id}, MAX_PRIORITY + 1)
@@ -1,59 +1,108 @@
+import gc
+import multiprocessing
+from multiprocessing.connection import wait
+import signal
+import sys
 import pika
+import torch
 from logger import get_logger
-from multiprocessing import Process
-from workers import FastPitchWorker, VitsWorker 
+from jobs import ARTICLE_QUEUES, WeightedPoller, declare_queues
+from workers import Worker
 import os
+import time
 
 log = get_logger(__name__)
 
+# seconds before a crashed consumer is forked again, so that a consumer failing at startup
+# (e.g. RabbitMQ still down) is not restarted in a tight loop
+RESTART_DELAY = 1
+# seconds waited before polling again when every article queue is empty
+POLL_INTERVAL = 0.1
+
 
 def create_worker():
-    """Creates a worker based on the model defined in the env variable: MODEL
+    """Creates the worker, loading the voices listed in the env variable: PRELOAD-VOICES
 
     Returns
     -------
     Worker
-        a concrete instance of a Worker
+        the worker, whose preloaded voices are shared by the consumers
     """
     n_torch_threads = int(os.getenv("TORCH-THREADS", 1))
-    model_name = str(os.getenv("MODEL", "FastPitch"))
-
-    if model_name == "FastPitch":
-        return FastPitchWorker(n_torch_threads)
-    elif model_name == "Vits":
-        return VitsWorker(n_torch_threads)
-    else:
-        log.fatal(f"No model found with name {model_name}.")
-        exit(1)
+    batch_size = int(os.getenv("BATCH-SIZE", 8))
+    preload = [voice.strip() for voice in os.getenv("PRELOAD-VOICES", "Male1").split(",") if voice.strip()]
+    return Worker(n_torch_threads, batch_size, preload)
 
 
-def run():
-    """Callable run by each process. Creates a consumer that receives podcast ids through the
-    tts_queue.
+def run(worker):
+    """Callable run by each forked process. Sets up the worker and polls the jobs of the scraped
+    articles from the article queues, one at a time, smaller podcasts first.
     """
-    worker = create_worker()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    start = time.perf_counter()
+    worker.start()
     connection = pika.BlockingConnection(
         pika.ConnectionParameters("rabbitmq", heartbeat=0))
     channel = connection.channel()
-    channel.queue_declare(queue="tts_queue", durable=True)
+    declare_queues(channel)
+    # assembly jobs are published before the message of the last article is acked
+    channel.confirm_delivery()
+
+    # polled instead of consumed: a prefetched message would skip the scheduling of the size classes
+    poller = WeightedPoller()
+    log.debug(f"TTS consumer started in {time.perf_counter() - start:.1f}s. Ready to consume.")
+    while True:
+        for size in poller.order():
+            method, properties, body = channel.basic_get(queue=ARTICLE_QUEUES[size])
+            if method is not None:
+                worker.run_job(channel, method, properties, body)
+                break
+        else:
+            connection.process_data_events(time_limit=POLL_INTERVAL)
+
+
+def supervise(worker, n_proc):
+    """Forks n_proc consumers sharing the models of worker, and forks a new one whenever one dies.
+    Never returns.
+    """
+    context = multiprocessing.get_context("fork")
+    processes = {}
 
-    channel.basic_qos(prefetch_count=1)
-    channel.basic_consume(queue="tts_queue",
-                          on_message_callback=worker.run_inference)
-    log.debug("TTS model loaded. Ready to consume.")
-    channel.start_consuming()
+    def fork(slot):
+        # daemonic: terminated when the supervisor exits
+        process = context.Process(target=run, args=(worker,), name=f"tts-{slot}", daemon=True)
+        process.start()
+        processes[slot] = process
+
+    log.debug(f"SPAWNING {n_proc} PROCESSES.")
+    for slot in range(n_proc):
+        fork(slot)
+
+    while True:
+        wait([process.sentinel for process in processes.values()])
+        for slot, process in list(processes.items()):
+            if not process.is_alive():
+                process.join()
+                log.error(f"TTS process {process.name} exited with code {process.exitcode}, restarting it.")
+                time.sleep(RESTART_DELAY)
+                fork(slot)
 
 
 if __name__ == "__main__":
     n_proc = int(os.getenv("PROCESSES", 1))
+    # exit through SystemExit on docker stop, so that the daemonic consumers are terminated too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
 
-    # launch inference processes
-    log.debug(f"SPAWNING {n_proc} PROCESSES.")
-    processes = []
-    for i in range(n_proc):
-        process = Process(target=run)
-        processes.append(process)
-        process.start()
+    # The models are loaded once, here, and shared by the consumers forked afterwards. The
+    # supervisor stays on a single torch thread: OpenMP threads started before a fork would
+    # deadlock the children, which set their own number of threads.
+    start = time.perf_counter()
+    torch.set_num_threads(1)
+    worker = create_worker()
+    worker.share_memory()
+    log.debug(f"TTS models loaded in {time.perf_counter() - start:.1f}s.")
 
-    for process in processes:
-        process.join()
+    # objects surviving the load are never collected: keep the collector from writing to
+    # their headers, which would copy the pages holding them into every consumer
+    gc.freeze()
+    supervise(worker, n_proc)
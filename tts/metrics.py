@@ -0,0 +1,82 @@
+import bisect
+import threading
+
+
+class StageMetrics:
+    """
+    Counters of a pipeline stage: items processed, time spent working on them and depth of the
+    input queue when each item was taken. A stage busy most of the time, with a deep input queue,
+    is the bottleneck of the pipeline.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.depth_total = 0
+        self.max_depth = 0
+
+    def record(self, busy_seconds: float, depth: int):
+        """Records an item that kept the stage busy for busy_seconds, taken with depth items waiting"""
+        with self.__lock:
+            self.items += 1
+            self.busy_seconds += busy_seconds
+            self.depth_total += depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def summary(self, elapsed: float) -> str:
+        """One line report of the stage over a period of elapsed seconds"""
+        with self.__lock:
+            mean_depth = self.depth_total / self.items if self.items else 0
+            utilization = 100 * self.busy_seconds / elapsed if elapsed > 0 else 0
+            return (f"{self.name}: {self.items} items, busy {self.busy_seconds:.2f}s ({utilization:.0f}%), "
+                    f"queue depth mean {mean_depth:.1f} max {self.max_depth}")
+
+
+class Histogram:
+    """
+    Latencies counted in exponential buckets. Percentiles are reported as the upper bound of the
+    bucket they fall in, which is enough to compare queues and size classes.
+    """
+
+    # upper bounds of the buckets, in seconds, the last bucket holds everything above
+    BOUNDS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self, name: str, bounds: tuple = BOUNDS):
+        self.name = name
+        self.bounds = bounds
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.samples = 0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float):
+        with self.__lock:
+            self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+            self.samples += 1
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1), the max for the last one"""
+        with self.__lock:
+            rank = q * self.samples
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= rank:
+                    return self.bounds[i] if i < len(self.bounds) else self.max_seconds
+            return 0.0
+
+    def summary(self) -> str:
+        """One line report: percentiles and the non empty buckets"""
+        buckets = ", ".join(f"<={bound}s: {count}" if i < len(self.bounds) else f">{self.bounds[-1]}s: {count}"
+                            for i, (bound, count) in enumerate(zip(self.bounds + (None,), self.counts)) if count)
+        return (f"{self.name}: {self.samples} samples, p50 {self.percentile(0.5):g}s, p95 {self.percentile(0.95):g}s, "
+                f"max {self.max_seconds:.1f}s [{buckets}]")
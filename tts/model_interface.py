@@ -1,7 +1,219 @@
 from abc import ABC, abstractmethod
+from typing import Any, List, NamedTuple, Optional, Tuple
+import hashlib
+import os
+import numpy as np
+
+
+class Speech(NamedTuple):
+    """Waveform of a padded sentence.
+
+    bounds holds the sample offsets (start, end) of the text between the padding,
+    or None when the model could not align it.
+    """
+    audio: np.ndarray
+    bounds: Optional[Tuple[int, int]] = None
+
+
+class Spectrogram(NamedTuple):
+    """Output of the acoustic model for a batch of padded sentences, the input of the vocoder.
+
+    features holds the model specific batch (mel spectrograms, latent variables...),
+    lengths the number of frames of each row and bounds the sample offsets of the text
+    between the padding of each row (see Speech).
+    """
+    features: Any
+    lengths: List[int]
+    bounds: List[Optional[Tuple[int, int]]]
+
+
+def length_buckets(lengths: List[int], max_batch_size: int) -> List[List[int]]:
+    """Groups sequence indices into batches of similar length, so that padding is kept small.
+
+    Parameters
+    ----------
+    lengths : list of int
+        length of every sequence
+    max_batch_size : int
+        maximum number of sequences in a batch
+
+    Returns
+    -------
+    list of list of int
+        the indices of the sequences belonging to each batch
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[i: i + max_batch_size] for i in range(0, len(order), max_batch_size)]
+
+
+def padding_bounds(durations: np.ndarray, n_prefix: int, n_suffix: int, hop_length: int):
+    """Converts token durations into the sample offsets of the text surrounded by the padding.
+
+    Parameters
+    ----------
+    durations : np.ndarray
+        number of frames generated for each token of the padded text
+    n_prefix : int
+        number of tokens generated by the prefix
+    n_suffix : int
+        number of tokens generated by the suffix
+    hop_length : int
+        number of audio samples per frame
+
+    Returns
+    -------
+    tuple of int or None
+        (start, end) sample offsets, None if the padding covers the whole text
+    """
+    end_token = len(durations) - n_suffix
+    if n_prefix >= end_token:
+        return None
+    frame_offsets = np.concatenate(([0], np.cumsum(durations)))
+    return int(frame_offsets[n_prefix]) * hop_length, int(frame_offsets[end_token]) * hop_length
+
+
+def module_bytes(*modules) -> int:
+    """Bytes taken by the parameters and buffers of torch modules, each tensor counted once"""
+    tensors = {}
+    for module in modules:
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            tensors[id(tensor)] = tensor
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors.values())
+
+
+def checkpoint_version(*paths: str) -> str:
+    """Identifies a set of checkpoint files by their name, size and modification time.
+
+    Parameters
+    ----------
+    paths : str
+        paths of the checkpoint files
+
+    Returns
+    -------
+    str
+        a short hex digest that changes whenever a checkpoint is replaced
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
 
 
 class Model(ABC):
+    # identifies the loaded checkpoints, used to invalidate cached audio
+    version = ""
+    # maximum number of sentences synthesized together
+    max_batch_size = 8
+
+    def __init__(self):
+        # (prefix, suffix) -> tokens they generate, measured on first use
+        self.__padding_tokens = {}
+
     @abstractmethod
     def synthesize(self, text: str):
         pass
+
+    @abstractmethod
+    def parse(self, text: str):
+        """Converts text into the token ids fed to the acoustic model
+
+        Parameters
+        ----------
+        text : str
+            the text to synthesize
+
+        Returns
+        -------
+        torch.Tensor
+            1-D tensor of token ids
+        """
+        pass
+
+    def parse_batch(self, texts: List[str]) -> list:
+        """parse over a list of texts, models with a batched front end should override it"""
+        return [self.parse(text) for text in texts]
+
+    @abstractmethod
+    def generate_spectrogram(self, tokens: list, n_prefix: int = 0, n_suffix: int = 0) -> Spectrogram:
+        """Runs the acoustic model over a batch of parsed sentences
+
+        Parameters
+        ----------
+        tokens : list of torch.Tensor
+            token ids of each sentence, as returned by parse
+        n_prefix : int
+            number of tokens generated by the prefix of each sentence
+        n_suffix : int
+            number of tokens generated by the suffix of each sentence
+
+        Returns
+        -------
+        Spectrogram
+            the acoustic features of the batch
+        """
+        pass
+
+    @abstractmethod
+    def vocode(self, spectrogram: Spectrogram) -> List[Speech]:
+        """Converts the acoustic features of a batch into waveforms
+
+        Parameters
+        ----------
+        spectrogram : Spectrogram
+            output of generate_spectrogram
+
+        Returns
+        -------
+        list of Speech
+            one waveform per sentence of the batch
+        """
+        pass
+
+    def share_memory(self):
+        """Moves the weights to shared memory, so that the processes forked after loading the
+        model use a single copy. Nothing to do for models without torch weights."""
+        pass
+
+    def weight_bytes(self) -> int:
+        """Bytes taken by the weights of the model, 0 for models without torch weights"""
+        return 0
+
+    def count_padding_tokens(self, prefix: str, suffix: str) -> Tuple[int, int]:
+        """Number of tokens generated by prefix and suffix when they wrap a text"""
+        if (prefix, suffix) not in self.__padding_tokens:
+            probe = "a"
+            n_probe = len(self.parse(probe))
+            n_prefix = len(self.parse(prefix + probe)) - n_probe
+            n_suffix = len(self.parse(probe + suffix)) - n_probe
+            self.__padding_tokens[(prefix, suffix)] = (n_prefix, n_suffix)
+        return self.__padding_tokens[(prefix, suffix)]
+
+    def synthesize_batch(self, texts: List[str], prefix: str = "", suffix: str = "") -> List[Speech]:
+        """Synthesizes a list of sentences, each one wrapped between prefix and suffix,
+        in batches of sentences of similar length.
+
+        Parameters
+        ----------
+        texts : list of str
+            the sentences to synthesize
+        prefix : str
+            text prepended to every sentence
+        suffix : str
+            text appended to every sentence
+
+        Returns
+        -------
+        list of Speech
+            one waveform per sentence, in the same order as texts
+        """
+        tokens = self.parse_batch([prefix + text + suffix for text in texts])
+        n_prefix, n_suffix = self.count_padding_tokens(prefix, suffix)
+
+        audios = [None] * len(texts)
+        for bucket in length_buckets([len(t) for t in tokens], self.max_batch_size):
+            spectrogram = self.generate_spectrogram([tokens[i] for i in bucket], n_prefix, n_suffix)
+            for i, speech in zip(bucket, self.vocode(spectrogram)):
+                audios[i] = speech
+        return audios
@@ -0,0 +1,213 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+import numpy as np
+from logger import get_logger
+from metrics import StageMetrics
+from model_interface import Spectrogram, length_buckets
+from synthesizer import Synthesizer
+
+log = get_logger(__name__)
+
+
+class ArticleJob:
+    """An article of a podcast travelling through the synthesis pipeline"""
+
+    def __init__(self, index: int, url: str, text: str, synthesizer: Synthesizer, abort: threading.Event):
+        self.index = index
+        self.url = url
+        self.text = text
+        self.synthesizer = synthesizer
+        # set as soon as any article of the podcast fails, so that the others stop early
+        self.abort = abort
+        self.error = None
+        self.audio = None
+        self.speech_job = None
+        self.speeches = None
+        self.pending = 0
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or self.abort.is_set()
+
+    def fail(self, error):
+        self.error = error
+        self.abort.set()
+
+
+class Batch:
+    """A length bucket of the sentences of an article, synthesized together"""
+
+    def __init__(self, job: ArticleJob, bucket: Optional[List[int]] = None, tokens: list = None,
+                 padding_tokens: Tuple[int, int] = (0, 0)):
+        self.job = job
+        # indices into job.speech_job.texts, None when the article has nothing to synthesize
+        self.bucket = bucket
+        self.tokens = tokens
+        self.padding_tokens = padding_tokens
+        self.spectrogram: Optional[Spectrogram] = None
+
+
+class Pipeline:
+    """
+    Runs a chain of stages, each one in its own threads, connected by bounded queues.
+    A job is submitted to the first stage, and a stage is a function taking an item of a job and
+    returning the items of the same job for the next stage; the last stage returns the finished job.
+    When a stage raises, the error is recorded on the job and the item is dropped. A failed job
+    whose items have all been dropped or consumed is delivered as it is, so that it never stays
+    in the pipeline.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[object], Iterable], int]], queue_size: int = 4):
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.results = queue.Queue()
+        self.metrics = [StageMetrics(name) for name, _, _ in stages]
+        self.__lock = threading.Lock()
+        # job -> items of the job waiting in the queues or being processed by a stage
+        self.__in_flight = {}
+        for i, (name, stage, n_threads) in enumerate(stages):
+            outbox = self.queues[i + 1] if i + 1 < len(stages) else None
+            for n in range(n_threads):
+                threading.Thread(target=self.__run_stage, args=(stage, self.queues[i], outbox, self.metrics[i]),
+                                 name=f"{name}-{n}", daemon=True).start()
+
+    def __run_stage(self, stage, inbox, outbox, metrics):
+        while True:
+            job, item = inbox.get()
+            depth = inbox.qsize()
+            start = time.perf_counter()
+            try:
+                outputs = list(stage(item))
+            except Exception as exc:
+                log.exception(f"Stage {metrics.name} failed: {exc}")
+                job.fail(exc)
+                outputs = []
+            metrics.record(time.perf_counter() - start, depth)
+
+            with self.__lock:
+                in_flight = self.__in_flight[job] - 1 + (len(outputs) if outbox is not None else 0)
+                if in_flight > 0:
+                    self.__in_flight[job] = in_flight
+                else:
+                    del self.__in_flight[job]
+            if outbox is None:
+                for output in outputs:
+                    self.results.put(output)
+            else:
+                for output in outputs:
+                    outbox.put((job, output))
+            if in_flight == 0 and not outputs:
+                # every item of the job was dropped or consumed without reaching the end
+                self.results.put(job)
+
+    def submit(self, job):
+        with self.__lock:
+            self.__in_flight[job] = 1
+        self.queues[0].put((job, job))
+
+    def log_metrics(self, elapsed: float):
+        for metrics in self.metrics:
+            log.info(metrics.summary(elapsed))
+            metrics.reset()
+
+
+class SynthesisPipeline(Pipeline):
+    """
+    Synthesizes articles already scraped in four stages, so that a batch of sentences is vocoded
+    while the acoustic model runs on the next one, and the articles submitted together overlap
+    (the tts workers submit one article at a time):
+
+    frontend (normalization, cache lookup and tokenization) -> acoustic model -> vocoder -> encode
+    (padding cut and caching of the sentences audio)
+
+    The audio is cached by the synthesizers, one entry per sentence: the sentences an article
+    shares with the ones synthesized before are never synthesized again.
+    """
+
+    def __init__(self, queue_size: int = 4):
+        super().__init__([("frontend", self.__frontend, 1),
+                          ("acoustic", self.__acoustic, 1),
+                          ("vocoder", self.__vocoder, 1),
+                          ("encode", self.__encode, 1)], queue_size)
+
+    def run(self, article_urls: List[str], synthesizer: Synthesizer, texts: List[str]) -> Optional[List[np.ndarray]]:
+        """Synthesizes the articles with synthesizer
+
+        Parameters
+        ----------
+        article_urls : list of str
+            urls of the articles of the podcast
+        synthesizer : Synthesizer
+            synthesizer of the requested voice
+        texts : list of str
+            scraped text of each article
+
+        Returns
+        -------
+        list of np.ndarray or None
+            int16 audio of each article, in the order of article_urls, None if any article failed
+        """
+        start = time.perf_counter()
+        abort = threading.Event()
+        for index, (url, text) in enumerate(zip(article_urls, texts)):
+            self.submit(ArticleJob(index, url, text, synthesizer, abort))
+
+        jobs = sorted((self.results.get() for _ in article_urls), key=lambda job: job.index)
+        self.log_metrics(time.perf_counter() - start)
+
+        for job in jobs:
+            if job.error is not None:
+                log.error(f"Could not synthesize article {job.url}: {job.error}")
+        if abort.is_set():
+            return None
+        return [job.audio for job in jobs]
+
+    def __frontend(self, job: ArticleJob):
+        if job.failed:
+            yield Batch(job)
+            return
+
+        model = job.synthesizer.model
+        prefix, suffix = job.synthesizer.padding()
+        job.speech_job = job.synthesizer.prepare(job.text)
+        if job.speech_job.texts:
+            log.debug(f"Synthesizing article: {job.url}")
+        else:
+            log.debug(f"Article: {job.url} has already been generated! Skipping inference.")
+        tokens = model.parse_batch([prefix + text + suffix for text in job.speech_job.texts])
+        padding_tokens = model.count_padding_tokens(prefix, suffix)
+        buckets = length_buckets([len(t) for t in tokens], model.max_batch_size)
+
+        job.speeches = [None] * len(tokens)
+        job.pending = len(buckets)
+        if not buckets:
+            yield Batch(job)
+        for bucket in buckets:
+            yield Batch(job, bucket, [tokens[i] for i in bucket], padding_tokens)
+
+    def __acoustic(self, batch: Batch):
+        if batch.bucket is not None and not batch.job.failed:
+            model = batch.job.synthesizer.model
+            batch.spectrogram = model.generate_spectrogram(batch.tokens, *batch.padding_tokens)
+        yield batch
+
+    def __vocoder(self, batch: Batch):
+        job = batch.job
+        if batch.bucket is None:
+            yield job
+            return
+
+        if not job.failed:
+            speeches = job.synthesizer.model.vocode(batch.spectrogram)
+            for i, speech in zip(batch.bucket, speeches):
+                job.speeches[i] = speech
+        # the article moves on once all of its batches are done
+        job.pending -= 1
+        if job.pending == 0:
+            yield job
+
+    def __encode(self, job: ArticleJob):
+        if not job.failed:
+            job.audio = job.synthesizer.complete(job.speech_job, job.speeches)
+        yield job
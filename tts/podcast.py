@@ -1,10 +1,29 @@
 import numpy as np
-from pydub import AudioSegment, effects
+from pydub import AudioSegment
+from synthesizer import SAMPLE_RATE
 
 
 class PodcastGenerator:
-    def __init__(self, jingle_path="jingles/default_jingle.mp3"):
-        self.__jingle = AudioSegment.from_mp3(jingle_path)
+    """
+    Assembles podcasts from the int16 waveforms of the articles, interleaved with the jingle.
+    Everything stays raw PCM until the podcast is encoded, once, by export.
+    """
+
+    def __init__(self, jingle_path="jingles/default_jingle.mp3", headroom=0.1):
+        self.jingle = jingle_path
+        # dB left between the loudest sample and full scale, as in pydub.effects.normalize
+        self.headroom = headroom
+
+    @staticmethod
+    def __load(jingle_path):
+        # decoded once and converted to the format of the synthesized audio
+        jingle = AudioSegment.from_mp3(jingle_path)
+        jingle = jingle.set_frame_rate(SAMPLE_RATE).set_channels(1).set_sample_width(2)
+        return np.array(jingle.get_array_of_samples(), dtype=np.int16)
+
+    @staticmethod
+    def __peak(audio):
+        return int(np.abs(audio.astype(np.int32)).max(initial=0))
 
     @property
     def jingle(self):
@@ -12,13 +31,74 @@ class PodcastGenerator:
 
     @jingle.setter
     def jingle(self, jingle_path):
-        self.__jingle = AudioSegment.from_mp3(jingle_path)
+        self.__jingle = self.__load(jingle_path)
+        self.__jingle_peak = self.__peak(self.__jingle)
+
+    def generate_segment(self, audios):
+        """Concatenates the articles, each one followed by the jingle, and normalizes the result.
+        The output is allocated once and every segment is scaled straight into it.
+
+        Parameters
+        ----------
+        audios : list of np.ndarray
+            int16 waveforms of the articles, sampled at SAMPLE_RATE
+
+        Returns
+        -------
+        np.ndarray
+            int16 waveform of the podcast
+        """
+        segments = [self.__jingle]
+        for audio in audios:
+            segments.append(audio)
+            segments.append(self.__jingle)
+        return self.__normalize(segments, [self.__jingle_peak] + [self.__peak(audio) for audio in audios])
+
+    def generate_chunk(self, audio=None):
+        """Chunk of the stream of a podcast, normalized on its own: an article followed by the
+        jingle, or the jingle opening the stream when audio is None.
+
+        Parameters
+        ----------
+        audio : np.ndarray
+            int16 waveform of the article, sampled at SAMPLE_RATE
+
+        Returns
+        -------
+        np.ndarray
+            int16 waveform of the chunk
+        """
+        if audio is None:
+            return self.__normalize([self.__jingle], [self.__jingle_peak])
+        return self.__normalize([audio, self.__jingle], [self.__peak(audio), self.__jingle_peak])
+
+    def __normalize(self, segments, peaks):
+        # the loudest sample of the output is the loudest among the segments
+        gain = self.__gain(max(peaks))
+
+        output = np.empty(sum(len(segment) for segment in segments), dtype=np.int16)
+        offset = 0
+        for segment in segments:
+            out = output[offset: offset + len(segment)]
+            if gain == 1:
+                out[:] = segment
+            else:
+                np.clip(np.rint(segment * gain), -32768, 32767, out=out, casting="unsafe")
+            offset += len(segment)
+        return output
 
-    def generate_segment(self, audio_segments):
-        final_segment = AudioSegment.empty()
-        final_segment += self.__jingle
-        for audio_segment in audio_segments:
-            final_segment += audio_segment
-            final_segment += self.__jingle
+    def __gain(self, peak):
+        if peak == 0:
+            return 1
+        return 32767 * 10 ** (-self.headroom / 20) / peak
 
-        return effects.normalize(final_segment)
+    def export(self, path, audio, bitrate="160k", stream=False):
+        """Encodes the int16 waveform to mp3. The chunks of a stream have no ID3 tag and no Xing
+        header, whose duration would make players stop at the end of the first chunk."""
+        parameters = ["-write_xing", "0", "-id3v2_version", "0"] if stream else None
+        AudioSegment(
+            audio.tobytes(),
+            frame_rate=SAMPLE_RATE,
+            sample_width=2,
+            channels=1
+        ).export(path, format="mp3", bitrate=bitrate, parameters=parameters)
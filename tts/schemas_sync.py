@@ -9,6 +9,15 @@ class Podcast(Document):
     article_urls: List[str]
     created_at: Union[datetime, None] = None
     file_path: Union[str, None] = None
+    # when the first article could be streamed
+    first_audio_at: Union[datetime, None] = None
+    # articles still being synthesized, and the indices of the finished ones
+    articles_pending: Union[int, None] = None
+    articles_done: List[int] = []
+    # characters of the articles scraped so far, to estimate the size of the podcast
+    chars_scraped: int = 0
+    articles_scraped: int = 0
+    priority: Union[int, None] = None
 
     class Settings:
         name = "podcast"
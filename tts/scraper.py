@@ -0,0 +1,162 @@
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import pika
+import pymongo
+from beanie.sync import init_beanie
+from pymongo import MongoClient
+from article_scraper import scrape_article
+from article_store import ArticleStore
+from enums import Status
+from bson import ObjectId
+from pymongo import ReturnDocument
+from jobs import PODCAST_QUEUE, SCRAPE_QUEUE, declare_queues, fail_podcast, finish_article, is_failed, publish, \
+    publish_job
+from logger import get_logger
+from schemas_sync import Podcast
+
+log = get_logger(__name__)
+
+# seconds before a consumer that dropped its connection connects again
+RECONNECT_DELAY = 5
+
+
+class ScraperWorker:
+    """
+    Scraper, splitting the podcasts into articles and scraping them, so that the tts workers only
+    ever run the models. Scraping waits on the network: many lightweight consumers, each a thread
+    with its own connection to the broker, run in a single process. The cleaned text of an article
+    is written to the article store, and its synthesis is queued only once it is there.
+    """
+
+    def __init__(self, n_consumers: int = 16):
+        self.n_consumers = n_consumers
+        try:
+            self.client = MongoClient(
+                "mongodb://mongo:27017"
+            )
+        except pymongo.errors.ConnectionFailure as cf:
+            log.fatal(f"Could not connect to database: {cf}")
+            exit(1)
+
+        init_beanie(database=self.client.podcast_db,
+                    document_models=[Podcast])
+        # for the atomic updates of the article counters
+        self.podcasts = self.client.podcast_db[Podcast.Settings.name]
+        log.info("Connected to database.")
+        self.article_store = ArticleStore(ttl=int(os.getenv("ARTICLE-TTL", 600)))
+
+    def split_podcast(self, ch, method, properties, body):
+        """Callback called by pika (RabbitMQ client).
+        Consumes messages from the podcast queue and splits each podcast into scrape jobs.
+
+        Parameters
+        ----------
+        body : byte str
+            the byte encoded string containing the podcast_id
+        """
+        try:
+            podcast_id = body.decode()
+            log.debug(f"Received podcast: {podcast_id}")
+            podcast = ~Podcast.get(podcast_id)
+            n_articles = len(podcast.article_urls)
+            podcast.update({"$set": {Podcast.status: Status.Running if n_articles else Status.Failed,
+                                     Podcast.articles_pending: n_articles,
+                                     Podcast.articles_done: [],
+                                     Podcast.chars_scraped: 0,
+                                     Podcast.articles_scraped: 0}})
+
+            for index, url in enumerate(podcast.article_urls):
+                publish(ch, SCRAPE_QUEUE, {"podcast_id": podcast_id, "index": index, "url": url,
+                                           "voice": podcast.voice, "priority": podcast.priority})
+        except Exception as e:
+            # dropped, instead of being delivered again and again
+            log.exception(f"Could not split podcast {body}, dropping it: {e!r}")
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            return
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
+    def scrape(self, ch, method, properties, body):
+        """Callback called by pika (RabbitMQ client).
+        Consumes messages from the scrape queue: scrapes the article into the article store and
+        queues its synthesis on the queue of the size class of the podcast, estimated from the
+        articles scraped so far.
+
+        Parameters
+        ----------
+        body : byte str
+            the json encoded job
+        """
+        try:
+            job = json.loads(body)
+            podcast_id, index = job["podcast_id"], job["index"]
+            # the articles of a podcast that already failed are only counted
+            if is_failed(self.podcasts, podcast_id):
+                finish_article(self.podcasts, ch, podcast_id, index)
+            elif text := scrape_article(job["url"], self.article_store):
+                podcast = self.podcasts.find_one_and_update(
+                    {"_id": ObjectId(podcast_id)},
+                    {"$inc": {"chars_scraped": len(text), "articles_scraped": 1}},
+                    return_document=ReturnDocument.AFTER)
+                publish_job(ch, podcast, {"job": "article", **job}, job.get("priority"))
+            else:
+                log.error(f"Could not scrape article {index} of podcast {podcast_id}: {job['url']}")
+                fail_podcast(self.podcasts, podcast_id)
+                finish_article(self.podcasts, ch, podcast_id, index)
+        except Exception as e:
+            log.exception(f"Scrape job {body} failed: {e!r}")
+            try:
+                # the podcast fails, instead of the job being delivered again and again
+                fail_podcast(self.podcasts, podcast_id)
+                finish_article(self.podcasts, ch, podcast_id, index)
+            except Exception as e:
+                log.exception(f"Could not fail scrape job {body}, dropping it: {e!r}")
+                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                return
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
+    def consume(self):
+        """Runs a consumer of the podcast and scrape queues, connecting again whenever its
+        connection drops. Never returns.
+        """
+        while True:
+            connection = None
+            try:
+                connection = pika.BlockingConnection(
+                    pika.ConnectionParameters("rabbitmq", heartbeat=0))
+                channel = connection.channel()
+                declare_queues(channel)
+                # jobs are published before the message that produced them is acked
+                channel.confirm_delivery()
+
+                channel.basic_qos(prefetch_count=1)
+                channel.basic_consume(queue=PODCAST_QUEUE,
+                                      on_message_callback=self.split_podcast)
+                channel.basic_consume(queue=SCRAPE_QUEUE,
+                                      on_message_callback=self.scrape)
+                channel.start_consuming()
+            except Exception as e:
+                # the unacked message, if any, goes back to the queue with the connection
+                log.exception(f"Scraper {threading.current_thread().name} failed ({e!r}), "
+                              f"reconnecting in {RECONNECT_DELAY}s.")
+                if connection is not None and connection.is_open:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+                time.sleep(RECONNECT_DELAY)
+
+    def run(self):
+        """Starts the consumers, each in its own thread. Never returns."""
+        for n in range(self.n_consumers):
+            threading.Thread(target=self.consume, name=f"scraper-{n}", daemon=True).start()
+        log.debug(f"{self.n_consumers} scrapers started. Ready to consume.")
+        threading.Event().wait()
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    ScraperWorker(int(os.getenv("SCRAPER-CONSUMERS", 16))).run()
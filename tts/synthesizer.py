@@ -1,34 +1,132 @@
 import re
+from typing import List, Optional
 import numpy as np
-from pydub import AudioSegment
-from pydub.silence import detect_silence
-import io
-import soundfile as sf
-from model_interface import Model
+from audio_cache import AudioCache
+from model_interface import Model, Speech
+
+SAMPLE_RATE = 16000
+
+
+def detect_silence(audio: np.ndarray, min_silence_len=50, silence_thresh=-30, seek_step=1):
+    """Vectorised equivalent of pydub.silence.detect_silence working on a float waveform.
+
+    Parameters
+    ----------
+    audio : np.ndarray
+        waveform with samples in [-1, 1]
+    min_silence_len : int
+        minimum length of a silence, in ms
+    silence_thresh : float
+        RMS level (dBFS) under which a window is considered silent
+    seek_step : int
+        step between two windows, in ms
+
+    Returns
+    -------
+    list of (int, int)
+        start and end sample of every silence
+    """
+    window = SAMPLE_RATE * min_silence_len // 1000
+    step = SAMPLE_RATE * seek_step // 1000
+    if len(audio) < window:
+        return []
+
+    # RMS of every window from a running sum of the squared samples
+    energy = np.concatenate(([0.], np.cumsum(np.square(audio, dtype=np.float64))))
+    starts = np.arange(0, len(audio) - window + 1, step)
+    rms = np.sqrt((energy[starts + window] - energy[starts]) / window)
+    silent = np.flatnonzero(rms <= 10 ** (silence_thresh / 20))
+    if silent.size == 0:
+        return []
+
+    # consecutive silent windows belong to the same silence
+    breaks = np.flatnonzero(np.diff(silent) > 1)
+    first = silent[np.concatenate(([0], breaks + 1))]
+    last = silent[np.concatenate((breaks, [silent.size - 1]))]
+    return list(zip(starts[first], starts[last] + window))
+
+
+class SpeechJob:
+    """Sentences of a text being synthesized.
+
+    audios holds the audio of each sentence found in the cache, and None for the others.
+    texts are the distinct sentences still to synthesize, each one appearing at the
+    indices listed in positions.
+    """
+
+    def __init__(self, sentences: List[str], keys: List[str], audios: List[Optional[np.ndarray]]):
+        self.sentences = sentences
+        self.keys = keys
+        self.audios = audios
+        missing = {}
+        for i, audio in enumerate(audios):
+            if audio is None:
+                missing.setdefault(keys[i], []).append(i)
+        self.positions = list(missing.values())
+        self.texts = [sentences[same[0]] for same in self.positions]
 
 
 class Synthesizer:
-    def __init__(self, model: Model):
+    def __init__(self, model: Model, voice: str, cache: AudioCache = None):
         self.__model = model
+        self.__voice = voice
+        self.__cache = cache
+
+    @property
+    def model(self) -> Model:
+        return self.__model
+
+    def cache_key(self, text: str) -> str:
+        """Key identifying the audio of text synthesized by this synthesizer"""
+        return AudioCache.key(text, type(self.__model).__name__, self.__voice, self.__model.version)
 
     def text_to_speech(self, text: str) -> np.ndarray:
-        audios = []
-        sentences = re.findall(r'.*?[.!:();\?]|.+?$', text)
+        job = self.prepare(text)
+        # sentences missing from the cache are synthesized together, in length-bucketed batches,
+        # and sentences repeated within the text are synthesized only once
+        speeches = self.__model.synthesize_batch(job.texts, *self.padding()) if job.texts else []
+        return self.complete(job, speeches)
+
+    def prepare(self, text: str) -> SpeechJob:
+        """Splits text into sentences and looks them up in the cache"""
+        sentences = []
         max_n_words = 25
-        for sentence in sentences:
+        for sentence in re.findall(r'.*?[.!:();\?]|.+?$', text):
             n_words = len(sentence.split(" "))
             if n_words > max_n_words:  # split
-                shorter_sentences = self.__split_by_words(
-                    sentence, max_n_words)
-                for shorter_sentence in shorter_sentences:
-                    text = self.__add_padding(shorter_sentence)
-                    audio = self.__cut_padding(self.__model.synthesize(text))
-                    audios.append(audio)
+                sentences.extend(self.__split_by_words(sentence, max_n_words))
             else:
-                text = self.__add_padding(sentence)
-                audios.append(self.__cut_padding(
-                    self.__model.synthesize(text)))
-        return np.concatenate(audios)
+                sentences.append(sentence)
+
+        audios = [None] * len(sentences)
+        keys = [self.cache_key(sentence) for sentence in sentences]
+        if self.__cache is not None:
+            audios = [self.__cache.get(key) for key in keys]
+        return SpeechJob(sentences, keys, audios)
+
+    def complete(self, job: SpeechJob, speeches: List[Speech]) -> np.ndarray:
+        """Cuts the padding from the synthesized sentences, caches them and joins the text audio
+
+        Parameters
+        ----------
+        job : SpeechJob
+            the job returned by prepare
+        speeches : list of Speech
+            the padded waveforms of job.texts
+
+        Returns
+        -------
+        np.ndarray
+            int16 waveform of the whole text
+        """
+        for same, speech in zip(job.positions, speeches):
+            audio = self.__cut_padding(speech)
+            if self.__cache is not None:
+                self.__cache.put(job.keys[same[0]], audio)
+            for i in same:
+                job.audios[i] = audio
+
+        return np.concatenate(job.audios)
 
     def __split_by_words(self, text, n_words):
         words = text.split()
@@ -36,17 +134,26 @@ class Synthesizer:
                      for i in range(0, len(words), n_words)]
         return sentences
 
-    def __add_padding(self, text):
-        return "prima. " + text + ". prima."
-
-    def __cut_padding(self, audio):
-        tmp_file = io.BytesIO()
-        sf.write(tmp_file, audio, samplerate=16000, format='wav')
-        audio_segment = AudioSegment.from_wav(tmp_file)
-        silences = detect_silence(
-            audio_segment, min_silence_len=50, silence_thresh=-30, seek_step=1)
-        silence_pad = 50  # ms
-        start = silences[1][1] - silence_pad
+    def padding(self):
+        """Text wrapped around every sentence, so that the model doesn't clip its start and end"""
+        return "prima. ", ". prima."
+
+    def __cut_padding(self, speech: Speech):
+        audio = speech.audio
+        if speech.bounds is not None:
+            start, end = speech.bounds
+        else:
+            start, end = self.__find_padding(audio)
+        audio = np.clip(audio[start:end], -1.0, 1.0)
+        return (audio * np.iinfo(np.int16).max).astype(np.int16)
+
+    def __find_padding(self, audio):
+        # fallback for models that can't align the padding: the text lies between
+        # the silence following the first "prima." and the one preceding the last
+        silences = detect_silence(audio, min_silence_len=50, silence_thresh=-30, seek_step=1)
+        if len(silences) < 4:
+            return 0, len(audio)
+        silence_pad = SAMPLE_RATE * 50 // 1000  # 50 ms
+        start = max(silences[1][1] - silence_pad, 0)
         end = silences[-2][0] + silence_pad
-        audio_segment = audio_segment[start:end]
-        return np.array(audio_segment.get_array_of_samples())
+        return start, end
@@ -0,0 +1,77 @@
+"""
+The repeat_interleave length regulators of FastPitch (regulate_len) and VITS (commons.expand_frames)
+must produce the same frames as the dense one-hot matmuls they replaced.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastpitch.NeMo.nemo.collections.tts.helpers.helpers import regulate_len  # noqa: E402
+from vits import commons  # noqa: E402
+
+BATCH_SIZE = 6
+CHANNELS = 16
+
+
+def reference_regulate_len(durations, enc_out, pace=1.0):
+    # regulate_len before repeat_interleave
+    dtype = enc_out.dtype
+    reps = durations.float() / pace
+    reps = (reps + 0.5).floor().long()
+    dec_lens = reps.sum(dim=1)
+
+    max_len = dec_lens.max()
+    reps_cumsum = torch.cumsum(torch.nn.functional.pad(reps, (1, 0, 0, 0), value=0.0), dim=1)[:, None, :]
+    reps_cumsum = reps_cumsum.to(dtype=dtype, device=enc_out.device)
+
+    range_ = torch.arange(max_len).to(enc_out.device)[None, :, None]
+    mult = (reps_cumsum[:, :, :-1] <= range_) & (reps_cumsum[:, :, 1:] > range_)
+    mult = mult.to(dtype)
+    return torch.matmul(mult, enc_out), dec_lens
+
+
+def reference_expand_frames(w_ceil, x_mask, m_p):
+    # SynthesizerTrn.infer before repeat_interleave
+    y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
+    y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(x_mask.dtype)
+    attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+    attn = commons.generate_path(w_ceil, attn_mask)
+    return torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(1, 2), y_mask
+
+
+def ragged_batch(length, seed):
+    # padded rows with zero durations on the padding, some zero durations within the sentences
+    # and a row that is all padding
+    generator = torch.Generator().manual_seed(seed)
+    lengths = torch.randint(1, length + 1, (BATCH_SIZE,), generator=generator)
+    lengths[-1] = 0
+    mask = commons.sequence_mask(lengths, length).float()
+    durations = torch.rand(BATCH_SIZE, length, generator=generator) * 8
+    durations[torch.rand(BATCH_SIZE, length, generator=generator) < 0.2] = 0
+    encoded = torch.randn(BATCH_SIZE, length, CHANNELS, generator=generator)
+    return durations * mask, mask, encoded
+
+
+@pytest.mark.parametrize("length", [1, 7, 64])
+@pytest.mark.parametrize("pace", [1.0, 0.8, 1.3])
+def test_regulate_len(length, pace):
+    durations, _, encoded = ragged_batch(length, seed=length)
+    reference, reference_lens = reference_regulate_len(durations, encoded, pace)
+    regulated, dec_lens = regulate_len(durations, encoded, pace)
+    assert torch.equal(dec_lens, reference_lens)
+    assert torch.equal(regulated, reference)
+
+
+@pytest.mark.parametrize("length", [1, 7, 64])
+def test_expand_frames(length):
+    durations, mask, encoded = ragged_batch(length, seed=length)
+    w_ceil = torch.ceil(durations).unsqueeze(1)
+    m_p = encoded.transpose(1, 2)
+    reference, y_mask = reference_expand_frames(w_ceil, mask.unsqueeze(1), m_p)
+    assert torch.equal(commons.expand_frames(w_ceil, m_p, y_mask.size(2)), reference)
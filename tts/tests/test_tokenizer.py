@@ -0,0 +1,57 @@
+"""
+The batched tokenizers of the FastPitch and VITS front ends must produce the same ids as the per
+character ones they replaced (BaseCharsTokenizer.encode, text_to_sequence + commons.intersperse).
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastpitch.sup import BaseCharsTokenizer, ItalianCharsTokenizer  # noqa: E402
+from vits import commons  # noqa: E402
+from vits.text import _symbol_to_id, clean_texts, cleaned_texts_to_batch  # noqa: E402
+
+TEXTS = [
+    "Buongiorno, questa è una prova.",
+    "Perché l'Italia? Città, università e caffè!",
+    "  spazi   multipli  e finali   ",
+    "Numeri 1234 e simboli: ; - ( ) « » “ ”",
+    "Emoji 😀 e caratteri sconosciuti ☃ nel testo",
+    "MAIUSCOLE e minuscole, àèéìòù ÀÈÉÌÒÙ",
+    "a",
+    "",
+]
+
+
+def reference_sequence(cleaned_text, add_blank):
+    # text_to_sequence and commons.intersperse, on text already cleaned
+    sequence = [_symbol_to_id[symbol] for symbol in cleaned_text]
+    return commons.intersperse(sequence, 0) if add_blank else sequence
+
+
+@pytest.mark.parametrize("pad_with_space", [True, False])
+def test_fastpitch_encode_batch(pad_with_space):
+    tokenizer = ItalianCharsTokenizer(punct=True, apostrophe=True, pad_with_space=pad_with_space)
+    tokens, lengths = tokenizer.encode_batch(TEXTS)
+    for row, (text, length) in enumerate(zip(TEXTS, lengths.tolist())):
+        assert tokens[row, :length].tolist() == BaseCharsTokenizer.encode(tokenizer, text), text
+        assert tokenizer.encode(text) == BaseCharsTokenizer.encode(tokenizer, text), text
+
+
+@pytest.mark.parametrize("add_blank", [True, False])
+def test_vits_cleaned_texts_to_batch(add_blank):
+    cleaned = [text for text in clean_texts(TEXTS, ["basic_cleaners"])
+               if all(symbol in _symbol_to_id for symbol in text)]
+    assert cleaned
+    sequences, lengths = cleaned_texts_to_batch(cleaned, add_blank)
+    for row, (text, length) in enumerate(zip(cleaned, lengths.tolist())):
+        assert sequences[row, :length].tolist() == reference_sequence(text, add_blank), text
+
+
+def test_vits_unknown_symbol():
+    with pytest.raises(KeyError):
+        cleaned_texts_to_batch(["☃"], True)
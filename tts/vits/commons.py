@@ -143,6 +143,21 @@ def generate_path(duration, mask):
   return path
 
 
+def expand_frames(duration, x, t_y):
+  """
+  duration: [b, 1, t_x], integer number of frames of each token
+  x: [b, d, t_x]
+  returns [b, d, t_y]: each token of x repeated duration times, zeros past the total duration of a row.
+  The same as multiplying x by generate_path, with repeat_interleave instead of a dense [b, t_y, t_x] path.
+  """
+  b, d, t_x = x.shape
+  duration = duration[:, 0].long()
+  frames = torch.repeat_interleave(x.transpose(1, 2).reshape(b * t_x, d), duration.reshape(-1), dim=0)
+  y = x.new_zeros(b, t_y, d)
+  y[torch.arange(t_y, device=x.device)[None, :] < duration.sum(1)[:, None]] = frames
+  return y.transpose(1, 2)
+
+
 def clip_grad_value_(parameters, clip_value, norm_type=2):
   if isinstance(parameters, torch.Tensor):
     parameters = [parameters]
@@ -497,6 +497,17 @@ class SynthesizerTrn(nn.Module):
     return o, l_length, attn, ids_slice, x_mask, y_mask, (z, z_p, m_p, logs_p, m_q, logs_q)
 
   def infer(self, x, x_lengths, sid=None, noise_scale=1, length_scale=1, noise_scale_w=1., max_len=None):
+    z, w_ceil, y_mask, g, latents = self.infer_latent(x, x_lengths, sid, noise_scale, length_scale, noise_scale_w)
+    o = self.dec(z[:,:,:max_len], g=g)
+    # the dense alignment is only built for the callers that plot it
+    x_mask = torch.unsqueeze(commons.sequence_mask(x_lengths, w_ceil.size(2)), 1).to(y_mask.dtype)
+    attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+    attn = commons.generate_path(w_ceil, attn_mask)
+    return o, attn, y_mask, latents
+
+  def infer_latent(self, x, x_lengths, sid=None, noise_scale=1, length_scale=1, noise_scale_w=1.):
+    """Everything infer does before the decoder: returns the masked latent z fed to dec
+    and the frames of each token, w_ceil [b, 1, t_x]"""
     x, m_p, logs_p, x_mask = self.enc_p(x, x_lengths)
     if self.n_speakers > 0:
       g = self.emb_g(sid).unsqueeze(-1) # [b, h, 1]
@@ -511,16 +522,12 @@ class SynthesizerTrn(nn.Module):
     w_ceil = torch.ceil(w)
     y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
     y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(x_mask.dtype)
-    attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
-    attn = commons.generate_path(w_ceil, attn_mask)
-
-    m_p = torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(1, 2) # [b, t', t], [b, t, d] -> [b, d, t']
-    logs_p = torch.matmul(attn.squeeze(1), logs_p.transpose(1, 2)).transpose(1, 2) # [b, t', t], [b, t, d] -> [b, d, t']
+    stats_p = commons.expand_frames(w_ceil, torch.cat([m_p, logs_p], 1), y_mask.size(2)) # [b, 2d, t] -> [b, 2d, t']
+    m_p, logs_p = torch.split(stats_p, m_p.size(1), dim=1)
 
     z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
     z = self.flow(z_p, y_mask, g=g, reverse=True)
-    o = self.dec((z * y_mask)[:,:,:max_len], g=g)
-    return o, attn, y_mask, (z, z_p, m_p, logs_p)
+    return z * y_mask, w_ceil, y_mask, g, (z, z_p, m_p, logs_p)
 
   def voice_conversion(self, y, y_lengths, sid_src, sid_tgt):
     assert self.n_speakers > 0, "n_speakers have to be larger than 0."
@@ -1,4 +1,5 @@
 """ from https://github.com/keithito/tacotron """
+import numpy as np
 from . import cleaners
 from .symbols import symbols
 
@@ -7,6 +8,11 @@ from .symbols import symbols
 _symbol_to_id = {s: i for i, s in enumerate(symbols)}
 _id_to_symbol = {i: s for i, s in enumerate(symbols)}
 
+# Codepoint -> ID of every symbol, -1 elsewhere. The last entry is -1, codepoints past the table are clipped to it
+_symbol_table = np.full(max(ord(s) for s in _symbol_to_id) + 2, -1, dtype=np.int64)
+for _symbol, _id in _symbol_to_id.items():
+  _symbol_table[ord(_symbol)] = _id
+
 
 def text_to_sequence(text, cleaner_names):
   '''Converts a string of text to a sequence of IDs corresponding to the symbols in the text.
@@ -25,6 +31,51 @@ def text_to_sequence(text, cleaner_names):
   return sequence
 
 
+def clean_texts(texts, cleaner_names):
+  '''Runs texts through the cleaners, using the batched version of a cleaner (<name>_batch)
+    when there is one.
+    Args:
+      texts: strings to clean
+      cleaner_names: names of the cleaner functions to run the texts through
+    Returns:
+      List of the cleaned strings
+  '''
+  for name in cleaner_names:
+    batch_cleaner = getattr(cleaners, name + '_batch', None)
+    if batch_cleaner is not None:
+      texts = batch_cleaner(texts)
+    else:
+      texts = [_clean_text(text, [name]) for text in texts]
+  return texts
+
+
+def cleaned_texts_to_batch(cleaned_texts, add_blank=False):
+  '''Converts cleaned strings to a padded array of IDs, as text_to_sequence does for each of them,
+    through the symbol table instead of a lookup per character.
+    Args:
+      cleaned_texts: strings to convert, already cleaned
+      add_blank: whether to intersperse blanks (ID 0) around the symbols, as commons.intersperse
+    Returns:
+      int64 array [len(cleaned_texts), max length] of IDs padded with 0, and int64 array of lengths
+  '''
+  codes = np.frombuffer(''.join(cleaned_texts).encode('utf-32-le'), dtype=np.uint32)
+  ids = _symbol_table[np.minimum(codes, len(_symbol_table) - 1)]
+  unknown = np.flatnonzero(ids < 0)
+  if len(unknown):
+    raise KeyError(chr(codes[unknown[0]]))
+
+  lengths = np.array([len(text) for text in cleaned_texts], dtype=np.int64)
+  owner = np.repeat(np.arange(len(cleaned_texts)), lengths)
+  columns = np.arange(len(ids)) - (np.cumsum(lengths) - lengths)[owner]
+  if add_blank:
+    # symbols go to the odd positions of [blank, s0, blank, s1, ..., blank]
+    lengths = 2 * lengths + 1
+    columns = 2 * columns + 1
+  sequences = np.zeros((len(cleaned_texts), lengths.max(initial=0)), dtype=np.int64)
+  sequences[owner, columns] = ids
+  return sequences, lengths
+
+
 def cleaned_text_to_sequence(cleaned_text):
   '''Converts a string of text to a sequence of IDs corresponding to the symbols in the text.
     Args:
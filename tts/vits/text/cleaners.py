@@ -12,14 +12,31 @@ hyperparameter. Some cleaners are English-specific. You'll typically want to use
      the symbols in symbols.py to match your data).
 '''
 
+import os
 import re
+import threading
 from unidecode import unidecode
 from phonemizer import phonemize
+from phonemizer.backend import EspeakBackend
+from phonemizer.punctuation import Punctuation
+from phonemizer.separator import default_separator
+from .lexicon import Lexicon
 
 
 # Regular expression matching whitespace:
 _whitespace_re = re.compile(r'\s+')
 
+# Words whose pronunciation can be taken from the lexicon: letters and apostrophes,
+# surrounded by the punctuation phonemizer preserves
+_punctuation = re.escape(Punctuation.default_marks())
+_lexicon_word_re = re.compile(r"([%s]*)([a-z']+)([%s]*)" % (_punctuation, _punctuation))
+_ipa_word_re = re.compile(r"([%s]*)(.+?)([%s]*)" % (_punctuation, _punctuation))
+
+# espeak backend and lexicon, created once per process by _italian_phonemizer
+_italian_backend = None
+_italian_lexicon = None
+_italian_lock = threading.Lock()
+
 # List of (regular expression, replacement) pairs for abbreviations:
 _abbreviations = [(re.compile('\\b%s\\.' % x[0], re.IGNORECASE), x[1]) for x in [
   ('mrs', 'misess'),
@@ -99,10 +116,55 @@ def english_cleaners2(text):
   phonemes = collapse_whitespace(phonemes)
   return phonemes
 
+def _italian_phonemizer():
+  global _italian_backend, _italian_lexicon
+  with _italian_lock:
+    if _italian_backend is None:
+      _italian_backend = EspeakBackend('it', preserve_punctuation=True, with_stress=True)
+      _italian_lexicon = Lexicon('.'.join(map(str, EspeakBackend.version())),
+                                 os.getenv('LEXICON-PATH', '/files/cache/lexicon.sqlite'))
+  return _italian_backend, _italian_lexicon
+
+
 def italian_cleaners(text):
   '''Pipeline for Italian text, including abbreviation expansion. + punctuation + stress'''
-  text = convert_to_ascii(text)
-  text = lowercase(text)
-  phonemes = phonemize(text, language='it', backend='espeak', strip=True, preserve_punctuation=True, with_stress=True)
-  phonemes = collapse_whitespace(phonemes)
-  return phonemes
+  return italian_cleaners_batch([text])[0]
+
+
+def italian_cleaners_batch(texts):
+  '''italian_cleaners over a list of texts, with a single espeak call.
+    Texts whose words are all in the lexicon skip espeak, and the words of the texts going
+    through espeak are added to the lexicon. Pronunciations are learned from whole sentences,
+    so that words keep the form espeak gives them in context.
+  '''
+  backend, lexicon = _italian_phonemizer()
+  texts = [collapse_whitespace(lowercase(convert_to_ascii(text))).strip() for text in texts]
+  words = [text.split() for text in texts]
+  matches = [[_lexicon_word_re.fullmatch(word) for word in text_words] for text_words in words]
+  known = lexicon.lookup([match.group(2) for text_matches in matches for match in text_matches if match])
+
+  phonemes = [''] * len(texts)
+  unknown = []
+  for i, text_matches in enumerate(matches):
+    if text_matches and all(match and match.group(2) in known for match in text_matches):
+      phonemes[i] = ' '.join(match.group(1) + known[match.group(2)] + match.group(3) for match in text_matches)
+    elif texts[i]:
+      # empty texts are dropped by espeak
+      unknown.append(i)
+
+  if unknown:
+    learned = {}
+    outputs = backend.phonemize([texts[i] for i in unknown], separator=default_separator, strip=True)
+    for i, output in zip(unknown, outputs):
+      phonemes[i] = output
+      ipa_words = output.split()
+      # words are learned only when espeak kept them one to one
+      if len(ipa_words) != len(words[i]):
+        continue
+      for match, ipa_word in zip(matches[i], ipa_words):
+        ipa = _ipa_word_re.fullmatch(ipa_word)
+        if match and ipa.group(1) == match.group(1) and ipa.group(3) == match.group(3):
+          learned[match.group(2)] = ipa.group(2)
+    lexicon.update(learned)
+
+  return [collapse_whitespace(p) for p in phonemes]
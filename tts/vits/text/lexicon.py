@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import threading
+
+
+class Lexicon:
+  '''Persistent word -> IPA cache, shared by the workers through the files volume.
+    Entries are tied to the espeak version that produced them.
+  '''
+
+  def __init__(self, version, db_path='/files/cache/lexicon.sqlite'):
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    self.version = version
+    self._words = {}
+    self._lock = threading.Lock()
+    self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    self._db.execute('PRAGMA journal_mode=WAL')
+    self._db.execute(
+      'CREATE TABLE IF NOT EXISTS lexicon (word TEXT NOT NULL, version TEXT NOT NULL, ipa TEXT NOT NULL, '
+      'PRIMARY KEY (word, version))')
+
+  def lookup(self, words):
+    '''Returns a dict with the pronunciation of the known words'''
+    missing = [word for word in set(words) if word not in self._words]
+    with self._lock:
+      for i in range(0, len(missing), 500):
+        chunk = missing[i: i + 500]
+        rows = self._db.execute(
+          'SELECT word, ipa FROM lexicon WHERE version = ? AND word IN (%s)' % ','.join('?' * len(chunk)),
+          [self.version] + chunk)
+        self._words.update(rows)
+    return {word: self._words[word] for word in words if word in self._words}
+
+  def update(self, entries):
+    '''Stores the pronunciations in entries, a dict word -> IPA'''
+    entries = {word: ipa for word, ipa in entries.items() if word not in self._words}
+    if not entries:
+      return
+    with self._lock:
+      self._db.executemany('INSERT OR IGNORE INTO lexicon VALUES (?, ?, ?)',
+                           [(word, self.version, ipa) for word, ipa in entries.items()])
+      self._words.update(entries)
@@ -1,14 +1,15 @@
 import torch
-from vits import commons
+from torch.nn.utils.rnn import pad_sequence
 from vits import utils
 from vits.models import SynthesizerTrn
 from vits.text.symbols import symbols
-from vits.text import text_to_sequence
-from model_interface import Model
+from vits.text import clean_texts, cleaned_texts_to_batch
+from model_interface import Model, Spectrogram, Speech, checkpoint_version, module_bytes, padding_bounds
 
 
 class VitsModel(Model):
-    def __init__(self, checkpoint_path):
+    def __init__(self, checkpoint_path, max_batch_size=8):
+        super().__init__()
         config = f"./vits/configs/ljs_base.json"
         self.hps = utils.get_hparams_from_file(config)
 
@@ -20,21 +21,56 @@ class VitsModel(Model):
         _ = self.net_g.eval()
 
         _ = utils.load_checkpoint(checkpoint_path, self.net_g, None)
+        self.max_batch_size = max_batch_size
+        self.version = checkpoint_version(checkpoint_path)
+
+    def share_memory(self):
+        self.net_g.share_memory()
+
+    def weight_bytes(self):
+        return module_bytes(self.net_g)
 
     def get_text(self, text, hps):
-        text_norm = text_to_sequence(text, hps.data.text_cleaners)
-        if hps.data.add_blank:
-            text_norm = commons.intersperse(text_norm, 0)
-        text_norm = torch.LongTensor(text_norm)
-        return text_norm
+        return self.encode_batch([text], hps)[0]
+
+    @staticmethod
+    def encode_batch(texts, hps):
+        """Cleans and encodes texts, returning the token ids of each one"""
+        # a single phonemizer call and a single lookup for all the texts
+        cleaned = clean_texts(texts, hps.data.text_cleaners)
+        sequences, lengths = cleaned_texts_to_batch(cleaned, hps.data.add_blank)
+        sequences = torch.from_numpy(sequences)
+        return [sequences[row, :length] for row, length in enumerate(lengths.tolist())]
 
-    @torch.inference_mode()
     def synthesize(self, text):
-        stn_tst = self.get_text(text, self.hps)
-
-        with torch.no_grad():
-            x_tst = stn_tst.unsqueeze(0)
-            x_tst_lengths = torch.LongTensor([stn_tst.size(0)])
-            audio = self.net_g.infer(x_tst, x_tst_lengths, noise_scale=.667, noise_scale_w=0.8, length_scale=1)[
-                0][0, 0].data.float().numpy()
-        return audio
+        return self.synthesize_batch([text])[0].audio
+
+    def parse(self, text):
+        return self.get_text(text, self.hps)
+
+    def parse_batch(self, texts):
+        return self.encode_batch(texts, self.hps)
+
+    @torch.inference_mode()
+    def generate_spectrogram(self, tokens, n_prefix=0, n_suffix=0):
+        # padded positions are masked out by x_lengths inside infer_latent
+        x = pad_sequence(tokens, batch_first=True)
+        x_lengths = torch.LongTensor([t.size(0) for t in tokens])
+        z, w_ceil, y_mask, g, _ = self.net_g.infer_latent(
+            x, x_lengths, noise_scale=.667, noise_scale_w=0.8, length_scale=1)
+        y_lengths = y_mask.sum([1, 2]).long()
+        # w_ceil is [b, 1, t_x], the frames of each token
+        durations = w_ceil[:, 0].long().numpy()
+        hop_length = self.hps.data.hop_length
+        bounds = [padding_bounds(durations[row, :int(x_lengths[row])], n_prefix, n_suffix, hop_length)
+                  for row in range(len(tokens))]
+        # the decoder is conditioned on the speaker embedding too, None for single speaker models
+        return Spectrogram((z, g), y_lengths.tolist(), bounds)
+
+    @torch.inference_mode()
+    def vocode(self, spectrogram):
+        z, g = spectrogram.features
+        audio = self.net_g.dec(z, g=g)[:, 0].data.float().numpy()
+        hop_length = self.hps.data.hop_length
+        return [Speech(audio[row, :length * hop_length], bounds)
+                for row, (length, bounds) in enumerate(zip(spectrogram.lengths, spectrogram.bounds))]
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+from omegaconf import OmegaConf
+from fastpitch.tts_model import FastpitchModel
+from inference_mode import enable_inference_mode
+from logger import get_logger
+from model_interface import Model
+from vits.tts_model import VitsModel
+
+log = get_logger(__name__)
+
+
+def load_fastpitch(max_batch_size: int, spec_gen_path: str, vocoder_path: str, conf_path: str) -> Model:
+    model = FastpitchModel(spec_gen_path, vocoder_path, conf_path, max_batch_size=max_batch_size)
+    # the modules are only used for inference, including the ones whose classes hydra just imported
+    enable_inference_mode()
+    return model
+
+
+def load_vits(max_batch_size: int, checkpoint_path: str) -> Model:
+    return VitsModel(checkpoint_path, max_batch_size=max_batch_size)
+
+
+# loader of each model family, called with max_batch_size and the fields of the voice configuration
+MODEL_FAMILIES = {
+    "FastPitch": load_fastpitch,
+    "Vits": load_vits,
+}
+
+
+class VoiceRegistry:
+    """
+    Models of the voices listed in a configuration file, loaded on first use.
+    The loaded models are kept in LRU order: once their memory goes beyond max_bytes, the least
+    recently used ones are evicted. The memory of a model is the size of its parameters and buffers.
+    The models moved to shared memory before the consumers are forked are never evicted.
+    """
+
+    def __init__(self, config_path: str = "voices.yaml", max_bytes: int = 4 * 1024 ** 3, max_batch_size: int = 8):
+        self.config: Dict[str, dict] = OmegaConf.to_container(OmegaConf.load(config_path))
+        for voice, conf in self.config.items():
+            if conf.get("model") not in MODEL_FAMILIES:
+                raise ValueError(f"Voice {voice} has an unknown model family: {conf.get('model')}")
+        self.max_bytes = max_bytes
+        self.max_batch_size = max_batch_size
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+        self.__lock = threading.Lock()
+        # voice -> (model, bytes), least recently used first
+        self.__models = OrderedDict()
+        # memory taken by each voice the last time it was loaded, to make room before loading it again
+        self.__footprints: Dict[str, int] = {}
+        # voices whose weights are shared with the forked consumers
+        self.__shared = set()
+
+    @property
+    def voices(self) -> List[str]:
+        return list(self.config)
+
+    @property
+    def loaded(self) -> List[str]:
+        return list(self.__models)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(size for _, size in self.__models.values())
+
+    def get(self, voice: str) -> Model:
+        """Returns the model of voice, loading it if it is not loaded yet.
+
+        Parameters
+        ----------
+        voice : str
+            name of the voice in the configuration
+
+        Returns
+        -------
+        Model
+            the loaded model
+
+        Raises
+        ------
+        KeyError
+            if voice is not in the configuration
+        """
+        with self.__lock:
+            if voice in self.__models:
+                self.__models.move_to_end(voice)
+                self.hits += 1
+                return self.__models[voice][0]
+            if voice not in self.config:
+                raise KeyError(f"Unknown voice: {voice}")
+
+            self.__evict(self.max_bytes - self.__footprints.get(voice, 0))
+            model = self.__load(voice)
+            self.__evict(self.max_bytes, keep=voice)
+            return model
+
+    def share_memory(self):
+        """Moves the weights of the loaded models to shared memory, before forking the consumers"""
+        with self.__lock:
+            for model, _ in self.__models.values():
+                model.share_memory()
+            self.__shared.update(self.__models)
+
+    def summary(self) -> str:
+        """One line report of the loaded voices and of the loads and evictions so far"""
+        with self.__lock:
+            return (f"voices: {', '.join(self.__models) or 'none'} loaded, "
+                    f"{self.resident_bytes / 1024 ** 2:.0f}/{self.max_bytes / 1024 ** 2:.0f} MB, "
+                    f"{self.hits} hits, {self.loads} loads in {self.load_seconds:.1f}s, {self.evictions} evictions")
+
+    def __load(self, voice):
+        conf = dict(self.config[voice])
+        family = conf.pop("model")
+        start = time.perf_counter()
+        model = MODEL_FAMILIES[family](self.max_batch_size, **conf)
+        seconds = time.perf_counter() - start
+        size = model.weight_bytes()
+
+        self.__models[voice] = (model, size)
+        self.__footprints[voice] = size
+        self.loads += 1
+        self.load_seconds += seconds
+        log.info(f"Voice {voice} ({family}) loaded in {seconds:.1f}s, {size / 1024 ** 2:.0f} MB.")
+        return model
+
+    def __evict(self, max_bytes, keep=None):
+        # evicted models stay alive until the podcasts still using them are done. A shared model is
+        # kept: its pages belong to the supervisor, evicting it in a consumer would free nothing and
+        # load a private copy on its next use
+        for voice in [voice for voice in self.__models if voice != keep and voice not in self.__shared]:
+            if self.resident_bytes <= max_bytes:
+                break
+            _, size = self.__models.pop(voice)
+            self.evictions += 1
+            log.info(f"Voice {voice} evicted, {size / 1024 ** 2:.0f} MB.")
@@ -1,4 +1,5 @@
-from abc import ABC, abstractmethod
+import json
+import shutil
 import numpy as np
 from logger import get_logger
 import requests
@@ -8,8 +9,6 @@ from schemas_sync import *
 from podcast import PodcastGenerator
 from schemas_sync import *
 from enums import *
-from fastpitch.tts_model import FastpitchModel
-from vits.tts_model import VitsModel
 from synthesizer import Synthesizer
 import os
 from pytz import timezone
@@ -17,20 +16,53 @@ from podcast import PodcastGenerator
 import os
 import torch
 import time
-from pydub import AudioSegment
-from article_scraper import scrape_article
+from article_store import ArticleStore, canonical_url
+from audio_cache import AudioCache
+from pipeline import SynthesisPipeline
+from voices import VoiceRegistry
+from jobs import ARTICLES_DIR, SIZE_CLASSES, STREAM_JINGLE_PATH, STREAMS_DIR, article_path, fail_podcast, \
+    finish_article, is_failed, prune_streams, remove_audio, stream_path
+from metrics import Histogram
+from bson import ObjectId
 
 log = get_logger(__name__)
 
 
-class Worker(ABC):
+class Worker:
     """
-    Base Worker class. Every TTS worker has to inherit from it.
+    TTS worker, serving every voice of the voice registry.
+    The scrapers split podcasts into articles and queue the synthesis of each one once its text is
+    in the article store, so that the articles of a podcast are synthesized in parallel by all the
+    workers. The worker finishing the last article queues the assembly of the podcast.
+    The voices to preload are loaded by __init__, once, in the supervisor process, the others on
+    first use. Connections, caches and threads are opened by start, in each consumer process
+    forked from it.
     """
 
-    def __init__(self):
-        os.makedirs(f"/files/articles", exist_ok=True)
+    def __init__(self, n_torch_threads=1, batch_size=8, preload=()):
         os.makedirs(f"/files/podcasts", exist_ok=True)
+        self.n_torch_threads = n_torch_threads
+        self.podcast = PodcastGenerator()
+        # every stream opens with the jingle, served before any article is synthesized
+        os.makedirs(STREAMS_DIR, exist_ok=True)
+        self.podcast.export(f"{STREAM_JINGLE_PATH}.tmp", self.podcast.generate_chunk(), stream=True)
+        os.replace(f"{STREAM_JINGLE_PATH}.tmp", STREAM_JINGLE_PATH)
+        self.voices = VoiceRegistry(
+            os.getenv("VOICES-CONFIG", "voices.yaml"),
+            max_bytes=int(os.getenv("MODEL-MEMORY-MB", 4096)) * 1024 ** 2,
+            max_batch_size=batch_size)
+        for voice in preload:
+            self.voices.get(voice)
+
+    def share_memory(self):
+        """Moves the weights of the preloaded models to shared memory, before the consumers are forked"""
+        self.voices.share_memory()
+
+    def start(self):
+        """Sets up the worker in the consumer process: torch threads, database session,
+        caches and synthesis pipeline.
+        """
+        torch.set_num_threads(self.n_torch_threads)
         # init db session
         try:
             self.client = MongoClient(
@@ -42,164 +74,122 @@ class Worker(ABC):
 
         init_beanie(database=self.client.podcast_db,
                     document_models=[Podcast])
+        # for the atomic updates of the article counters
+        self.podcasts = self.client.podcast_db[Podcast.Settings.name]
         log.info("Connected to database.")
-        self.podcast = PodcastGenerator()
-
-    def get_articles(self, article_urls):
-        """Retrieves articles given the urls.
-
-        Parameters
-        ----------
-        article_urls : list of str
-            list of article urls
-
-        Returns
-        -------
-        list of dict
-            a list of {"url": <article_url>, "text": <fulltext.>}
-        """
-        articles = list(dict())
-        for url in article_urls:
-            article = { "url": url, "text": scrape_article(url) }
-            if article:
-                articles.append(article)
-            else:
-                log.error(f"Could not scrape article: {url}")
-                return None
-
-        return articles
-
-    def save_as_mp3(self, audio_path: str, audio: np.ndarray):
-        """Saves np.array audio wave as mp3
-
-        Parameters
-        ----------
-        audio_path : str
-            audio file path
-        audio : np.array
-            audio waveform
-        """
-        audio_segment = AudioSegment(
-            audio.tobytes(),
-            frame_rate=16000,
-            sample_width=audio.dtype.itemsize,
-            channels=1
-        )
-        audio_segment.export(audio_path, format="mp3", bitrate="160k")
+        self.audio_cache = AudioCache(
+            max_bytes=int(os.getenv("AUDIO-CACHE-MB", 2048)) * 1024 ** 2)
+        self.article_store = ArticleStore()
+        self.pipeline = SynthesisPipeline()
+        # per size class: time the jobs waited in their queue, from request to the first article
+        # that can be streamed, and from request to podcast
+        self.queue_wait = {size: Histogram(f"queue wait {size}") for size, _ in SIZE_CLASSES}
+        self.first_audio = {size: Histogram(f"first audio {size}") for size, _ in SIZE_CLASSES}
+        self.latency = {size: Histogram(f"end to end {size}") for size, _ in SIZE_CLASSES}
+
+    def get_synthesizer(self, voice):
+        """Synthesizer of voice, loading its model if needed. None if the voice cannot be loaded"""
+        try:
+            model = self.voices.get(voice)
+        except Exception as e:
+            log.exception(f"Could not load voice {voice}: {e}")
+            return None
+        return Synthesizer(model, voice, self.audio_cache)
 
-    @abstractmethod
-    def run_inference(self, ch, method, properties, body):
-        """Callback called by pika (RabbitMQ client).
-        Consumes messages from the task queue and generates podcasts.
+    def run_job(self, ch, method, properties, body):
+        """Callback called for the messages polled from the article queues: synthesis of an article
+        or assembly of a podcast.
 
         Parameters
         ----------
         body : byte str
-            the byte encoded string containing the podcast_id
+            the json encoded job
         """
-        pass
-
-
-class FastPitchWorker(Worker):
-    def __init__(self, n_torch_threads):
-        super().__init__()
-        torch.set_num_threads(n_torch_threads)
-        BASE = "/checkpoints/fastpitch"
-        self.male1_model = FastpitchModel(
-            f"{BASE}/male1/FastPitch.ckpt", f"{BASE}/male1/HifiGan.ckpt", "./male_conf.yaml")
-        # self.female1_model = FastpitchModel(
-        #     f"{BASE}/female1/FastPitch.ckpt", f"{BASE}/female1/HifiGan.ckpt", "./female_conf.yaml")
-
-        self.male1_synthesizer = Synthesizer(self.male1_model)
-        # self.female1_synthesizer = Synthesizer(self.female1_model)
-
-    def run_inference(self, ch, method, properties, body):
-        podcast_id = body.decode()
-        log.debug(f"Received podcast: {podcast_id}")
-        podcast = ~Podcast.get(podcast_id)
-        podcast.update({"$set": {Podcast.status: Status.Running}})
-
-        if podcast.voice == Voice.Female1:
-            synthesizer = self.female1_synthesizer
-        elif podcast.voice == Voice.Male1:
-            synthesizer = self.male1_synthesizer
-
-        audios = []
-        articles = super().get_articles(podcast.article_urls)
-        if articles:
-            for article in articles:
-                article_name = article["url"].split("/")[-1]
-                audio_path = f"/files/articles/{article_name}_{podcast.voice}.mp3"
-
-                if not os.path.isfile(audio_path):
-                    text = article["text"]
-                    log.debug(f"Synthesizing article: {article['url']}")
-                    audio = synthesizer.text_to_speech(text)
-                    audio = super().save_as_mp3(audio_path, audio)
-                else:
-                    log.debug(
-                        f"Article: {article['url']} has already been generated! Skipping inference.")
-
-                audio_segment = AudioSegment.from_mp3(audio_path)
-                audios.append(audio_segment)
-
-            final_segment = self.podcast.generate_segment(audios)
-            podcast_path = f"/files/podcasts/{podcast_id}.mp3"
-            final_segment.export(podcast_path, format="mp3", bitrate="160k")
-            log.debug(f"Successfully generated podcast: {podcast_id}")
-            podcast.update({"$set": {Podcast.status: Status.Succeeded,
-                            Podcast.file_path: podcast_path,
-                                     Podcast.created_at: datetime.now(timezone("Europe/Rome"))}})
-
-        else:  # request failed
-            log.error(f"Failed at generating podcast: {podcast_id}")
-            podcast.update({"$set": {Podcast.status: Status.Failed}})
+        try:
+            job = json.loads(body)
+        except ValueError as e:
+            log.error(f"Dropping malformed job {body}: {e!r}")
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            return
+        try:
+            self.queue_wait[job["size"]].record(time.time() - job["queued_at"])
+            if job["job"] == "article":
+                self.synthesize_article(ch, job)
+            else:
+                self.assemble_podcast(job["podcast_id"], job["size"])
+        except Exception as e:
+            log.exception(f"Job {body} failed: {e!r}")
+            try:
+                # the podcast fails, instead of the job being delivered again and again
+                self.fail_job(ch, job)
+            except Exception as e:
+                log.exception(f"Could not fail job {body}, dropping it: {e!r}")
+                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                return
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
-
-class VitsWorker(Worker):
-    def __init__(self, n_torch_threads):
-        super().__init__()
-        torch.set_num_threads(n_torch_threads)
-        BASE = "/checkpoints/vits"
-        self.vits_model = VitsModel(f"{BASE}/vits.pth")
-        self.synthesizer = Synthesizer(self.vits_model)
-
-    def run_inference(self, ch, method, properties, body):
-        podcast_id = body.decode()
-        log.debug(f"Received podcast: {podcast_id}")
+    def fail_job(self, ch, job):
+        """Fails the podcast of a job that raised. A failed article is still counted, so that the
+        audio of the podcast is removed once its last article is done."""
+        fail_podcast(self.podcasts, job["podcast_id"])
+        if job["job"] == "article":
+            finish_article(self.podcasts, ch, job["podcast_id"], job["index"])
+        else:
+            remove_audio(job["podcast_id"])
+
+    def synthesize_article(self, ch, job):
+        podcast_id, index = job["podcast_id"], job["index"]
+        # the articles of a podcast that already failed are only counted
+        if not is_failed(self.podcasts, podcast_id):
+            # written by the scraper before it queued the job
+            stored = self.article_store.get(canonical_url(job["url"]))
+            synthesizer = self.get_synthesizer(job["voice"])
+            audios = None
+            if stored is not None and synthesizer is not None:
+                audios = self.pipeline.run([job["url"]], synthesizer, [stored.text])
+            if audios:
+                path = article_path(podcast_id, index)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                audios[0].tofile(f"{path}.tmp")
+                os.replace(f"{path}.tmp", path)
+                self.stream_article(podcast_id, index, audios[0], job["size"])
+            else:
+                log.error(f"Failed at generating article {index} of podcast: {podcast_id}")
+                fail_podcast(self.podcasts, podcast_id)
+        finish_article(self.podcasts, ch, podcast_id, index)
+
+    def stream_article(self, podcast_id, index, audio, size):
+        """Publishes the mp3 chunk of an article to the stream of its podcast. The first article
+        is the first audio of the podcast that can be streamed after the jingle."""
+        path = stream_path(podcast_id, index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.podcast.export(f"{path}.tmp", self.podcast.generate_chunk(audio), stream=True)
+        os.replace(f"{path}.tmp", path)
+        if index == 0:
+            self.podcasts.update_one({"_id": ObjectId(podcast_id), "first_audio_at": None},
+                                     {"$set": {"first_audio_at": datetime.now(timezone("Europe/Rome"))}})
+            self.first_audio[size].record(time.time() - ObjectId(podcast_id).generation_time.timestamp())
+
+    def assemble_podcast(self, podcast_id, size):
         podcast = ~Podcast.get(podcast_id)
-        podcast.update({"$set": {Podcast.status: Status.Running}})
-
-        audios = []
-        articles = super().get_articles(podcast.article_urls)
-        if articles:
-            for article in articles:
-                article_name = article["url"].split("/")[-1]
-                audio_path = f"/files/articles/{article_name}_vits.mp3"
-
-                if not os.path.isfile(audio_path):
-                    text = article["text"]
-                    log.debug(f"Synthesizing article: {article['url']}")
-                    audio = self.synthesizer.text_to_speech(text)
-                    audio = super().save_as_mp3(audio_path, audio)
-                else:
-                    log.debug(
-                        f"Article: {article['url']} has already been generated! Skipping inference.")
-
-                audio_segment = AudioSegment.from_mp3(audio_path)
-                audios.append(audio_segment)
-
-            final_segment = self.podcast.generate_segment(audios)
-            podcast_path = f"/files/podcasts/{podcast_id}.mp3"
-            final_segment.export(podcast_path, format="mp3", bitrate="160k")
-            log.debug(f"Successfully generated podcast: {podcast_id}")
-            podcast.update({"$set": {Podcast.status: Status.Succeeded,
-                            Podcast.file_path: podcast_path,
-                                     Podcast.created_at: datetime.now(timezone("Europe/Rome"))}})
-
-        else:  # request failed
-            log.error(f"Failed at generating podcast: {podcast_id}")
-            podcast.update({"$set": {Podcast.status: Status.Failed}})
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-
+        if podcast.status != Status.Running:
+            return
+        log.debug(self.voices.summary())
+        audios = [np.fromfile(article_path(podcast_id, index), dtype=np.int16)
+                  for index in range(len(podcast.article_urls))]
+        final_audio = self.podcast.generate_segment(audios)
+        podcast_path = f"/files/podcasts/{podcast_id}.mp3"
+        self.podcast.export(podcast_path, final_audio)
+        log.debug(f"Successfully generated podcast: {podcast_id}")
+        podcast.update({"$set": {Podcast.status: Status.Succeeded,
+                        Podcast.file_path: podcast_path,
+                                 Podcast.created_at: datetime.now(timezone("Europe/Rome"))}})
+        shutil.rmtree(os.path.join(ARTICLES_DIR, podcast_id), ignore_errors=True)
+        prune_streams()
+
+        # the podcast was requested when its id was generated
+        self.latency[size].record(time.time() - ObjectId(podcast_id).generation_time.timestamp())
+        for name, _ in SIZE_CLASSES:
+            log.debug(self.queue_wait[name].summary())
+            log.debug(self.first_audio[name].summary())
+            log.debug(self.latency[name].summary())